@@ -1,16 +1,48 @@
 #Made by P. Pauwels (https://github.com/pipauwel/IFCtoLBD)
 from datetime import datetime
 import ifcopenshell as ios
-from ifcopenshell.util.element import get_psets
+import ifcopenshell.geom
+import ifcopenshell.util.shape
+import ifcopenshell.util.unit
+import numpy as np
+import sqlite3
+from ifcopenshell.util.element import get_property_definition, get_properties, get_type
 import Namespace
 import os
+import io
 import re
+import sys
+import hashlib
+import time
+import glob
+import json
+import argparse
+import fnmatch
+import csv
+import shutil
+import tempfile
+import copy
+from contextlib import contextmanager
+import queue
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
+from rdflib import BNode, Graph, Literal, URIRef
 import tkinter as tk
 from tkinter import filedialog, simpledialog, messagebox 
+from progress_ui import run_with_progress, Cancelled
+
+# Optional: Arrow/Parquet output of the property table (CSV otherwise)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
 
-global baseURI 
 inputFile = ""
 targetFile = ""
 
@@ -18,11 +50,45 @@ includeBuildingElements = True
 includeBuildingProperties = True
 includeQuantities = True
 includeGeometry = False
+# Material layers, constituents and their psets as shared inst:material_<id> nodes
+includeMaterials = True
+# Write the psets of each type object once on a type node instead of on every instance
+deduplicateTypes = False
+# Type elements with their BEO/MEP class (beo:Wall, mep:Pump, ...) next to bot:Element
+includeClassification = True
+
+# Namespace of the converted instances; a timestamp or hash is appended
+BASE_URI_PREFIX = "http://linkedbuildingdata.net/ifc/resources"
+
+# Default location and size limit of the conversion output cache
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ifctolbd")
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3
+
+# Property name table shared by all runs (see PropertySchema)
+PROPERTY_SCHEMA_FILE = os.path.join(DEFAULT_CACHE_DIR, "property_schema.json")
+
+# Tessellation results (bounding box, volume, area) by GlobalId + representation hash
+GEOMETRY_CACHE_FILE = os.path.join(DEFAULT_CACHE_DIR, "geometry.sqlite")
+# Threads of the ifcopenshell geometry iterator
+GEOMETRY_THREADS = os.cpu_count() or 1
+
+# Write buffer (bytes) for the streamed TTL output
+TTL_WRITE_BUFFER = 1024 * 1024
+
+# Entities converted between two checkpoints of a checkpointed conversion
+CHECKPOINT_BATCH = 1000
 
-# Global list to store Excel data
-excel_data = []
+# Entity blocks (and Excel rows) handed between pipeline stages at a time
+PIPELINE_BATCH = 256
+# Batches waiting between two pipeline stages before the producer blocks
+PIPELINE_QUEUE_SIZE = 32
 
-# Global dictionary to store element filters
+# Smallest number of entities handed to one worker in parallel mode
+SHARD_MIN_SIZE = 500
+# Shards per worker, so that slow shards do not leave cores idle
+SHARDS_PER_WORKER = 4
+
+# Default element filters, copied into the state of every thread
 element_filters = {
     'sites': True,
     'buildings': True,
@@ -30,35 +96,126 @@ element_filters = {
     'spaces': True,
     'elements': True,
     'interfaces': True,
-    'zones': True
+    'zones': True,
+    # Fine-grained filters, applied before the properties are read (empty = everything):
+    'include_classes': [],    # only elements of these IFC classes (and their subtypes)
+    'exclude_classes': [],    # skip elements of these IFC classes (and their subtypes)
+    'pset_patterns': [],      # property/quantity set names, e.g. "DPP*" (case-insensitive)
+    'property_patterns': [],  # property names, e.g. "Dpp_*" (case-insensitive)
 }
 
-def select_element_types(model):
+class ConversionState(threading.local):
+    """Configuration, output buffers and indexes of the conversion on this thread.
+
+    Every thread sees its own attributes, initialised from the module-level
+    settings above on first use, so conversions running in different threads
+    (see LBDConverter) share nothing but the caches on disk.
+    """
+
+    def __init__(self):
+        self.includeBuildingProperties = includeBuildingProperties
+        self.includeQuantities = includeQuantities
+        self.includeGeometry = includeGeometry
+        self.includeMaterials = includeMaterials
+        self.deduplicateTypes = deduplicateTypes
+        self.includeClassification = includeClassification
+        self.element_filters = copy.deepcopy(element_filters)
+        # Namespace of the instances (inst:)
+        self.baseURI = ""
+        # Excel rows: a list, PropertyTable or one of the streaming row sinks
+        self.excel_data = []
+        # RDF syntax written by the emitters: 'ttl', 'nt' (N-Triples) or 'nq' (N-Quads),
+        # picked from the extension of the output file
+        self.output_format = 'ttl'
+        # Raw property name -> (clean name, unit), loaded for every conversion
+        self.property_schema = None
+        # Entity id -> property sets, rebuilt for every converted model
+        self.pset_index = None
+        # Parent id -> child ids of the topology relations, rebuilt for every converted model
+        self.relationship_index = None
+        # Element id -> bounding box, volume and area, only built when includeGeometry is set
+        self.geometry_index = None
+        # Object id -> material node id and the material nodes to write, rebuilt for every converted model
+        self.material_index = None
+        # IFC class -> beo:/mep: class of the converted model's schema (see elementClassTable)
+        self.element_classes = {}
+        # Entity id -> entity of a GUID-targeted extraction (see collectTargets), None converts everything
+        self.target_entities = None
+        # Receives phase(text, total) and advance(count) calls (see progress_ui.ProgressReporter)
+        self.progress = None
+
+    # Attributes that configure a conversion, as opposed to its buffers and indexes
+    SETTINGS = ('includeBuildingProperties', 'includeQuantities', 'includeGeometry', 'includeMaterials',
+                'deduplicateTypes', 'includeClassification', 'element_filters')
+
+    def settings(self):
+        return {name: copy.deepcopy(getattr(self, name)) for name in self.SETTINGS}
+
+    def snapshot(self):
+        return dict(self.__dict__)
+
+    def restore(self, snapshot):
+        self.__dict__.clear()
+        self.__dict__.update(snapshot)
+
+# State of the conversion running on the current thread
+state = ConversionState()
+
+def compilePatterns(patterns):
+    """One case-insensitive regex for a list of glob patterns, None for no patterns"""
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE)
+
+def categoryEnabled(key):
+    # Type nodes are only written when the type psets are deduplicated
+    if key == 'types' and not state.deduplicateTypes:
+        return False
+    if key == 'materials' and not state.includeMaterials:
+        return False
+    return state.element_filters.get(key, True)
+
+def selectEntities(model, key, ifc_class):
+    """Entities of one LBD category, after the include/exclude class filters of elements"""
+    if key == 'materials':
+        # Only the materials that objects are associated with, each once
+        index = state.material_index
+        if index is None or index.model is not model:
+            index = MaterialIndex(model, materialScope(filteredEntities(model)))
+        return list(index.nodes.values())
+    if state.target_entities is not None:
+        targets = state.target_entities
+        entities = [targets[i] for i in sorted(targets) if targets[i].is_a(ifc_class)]
+    else:
+        entities = model.by_type(ifc_class)
+    if key != 'elements':
+        return entities
+    include = state.element_filters.get('include_classes')
+    exclude = state.element_filters.get('exclude_classes')
+    if include:
+        entities = [e for e in entities if any(e.is_a(c) for c in include)]
+    if exclude:
+        entities = [e for e in entities if not any(e.is_a(c) for c in exclude)]
+    return entities
+
+def select_element_types(model, profile=None):
     """Show dialog to select which element types to process"""
-    global element_filters
-    
-    # Count elements in model
-    counts = {
-        'Sites': len(list(model.by_type("IfcSite"))),
-        'Buildings': len(list(model.by_type("IfcBuilding"))),
-        'Storeys': len(list(model.by_type("IfcBuildingStorey"))),
-        'Spaces': len(list(model.by_type("IfcSpace"))),
-        'Elements': len(list(model.by_type("IfcElement"))),
-        'Interfaces': len(list(model.by_type("IfcRelSpaceBoundary"))),
-        'Zones': len(list(model.by_type("IfcZone")))
-    }
+    
+    # Count elements in model, with their properties for the estimate
+    if profile is None:
+        profile = ModelProfile(model)
     
     # Create selection dialog
     dialog = tk.Toplevel()
     dialog.title("Select Element Types to Process")
-    dialog.geometry("400x350")
+    dialog.geometry("400x390")
     dialog.attributes('-topmost', True)
     
     # Center the dialog
     dialog.update_idletasks()
     x = (dialog.winfo_screenwidth() // 2) - (400 // 2)
-    y = (dialog.winfo_screenheight() // 2) - (350 // 2)
-    dialog.geometry(f"400x350+{x}+{y}")
+    y = (dialog.winfo_screenheight() // 2) - (390 // 2)
+    dialog.geometry(f"400x390+{x}+{y}")
     
     tk.Label(dialog, text="Select which element types to include:", 
              font=('Arial', 11, 'bold'), pady=10).pack()
@@ -81,15 +238,29 @@ def select_element_types(model):
         'Zones': 'zones'
     }
     
+    estimate_label = tk.Label(dialog, font=('Arial', 9, 'italic'))
+    calibration = loadCalibration()
+    
+    def update_estimate(*args):
+        categories = [key for key, ifc_class, writer, label in LBD_CATEGORIES
+                      if (vars_dict[key].get() if key in vars_dict else categoryEnabled(key))]
+        estimate = profile.estimate(categories, calibration=calibration)
+        estimate_label.config(text=f"≈ {estimate['triples']:,} triples, {estimate['rows']:,} Excel rows, "
+                                   f"{formatDuration(estimate['total_seconds'])}")
+    
     for display_name, key in mapping.items():
         var = tk.BooleanVar(value=True)
         vars_dict[key] = var
-        count = counts[display_name]
+        count = profile.categories[key]['entities']
         cb = tk.Checkbutton(frame, 
                            text=f"{display_name} ({count} found)",
                            variable=var,
                            font=('Arial', 10))
         cb.pack(anchor='w', pady=3, padx=20)
+        var.trace_add('write', update_estimate)
+    
+    estimate_label.pack()
+    update_estimate()
     
     # Buttons
     button_frame = tk.Frame(dialog)
@@ -108,7 +279,7 @@ def select_element_types(model):
     def confirm():
         result['confirmed'] = True
         for key, var in vars_dict.items():
-            element_filters[key] = var.get()
+            state.element_filters[key] = var.get()
         dialog.destroy()
     
     def cancel():
@@ -124,68 +295,1685 @@ def select_element_types(model):
     
     return result['confirmed']
 
-def convertIFCSPFtoTTL(inputFile, outputFile):
-    inputFile = inputFile
-    outputFile = outputFile
-    now = datetime.now()
-    current_time = now.strftime('%Y%m%d_%H%M%S')
-	
-    DEFAULT_PATH = "http://linkedbuildingdata.net/ifc/resources" + current_time + "/"
-    global baseURI, excel_data
-    baseURI = DEFAULT_PATH
-    excel_data = []  # Reset for each conversion
-
-	#Enter the name of the ifc file behind pad between the " ". Just like the example. - reading file - IfcSpfReader
-    pad = "Project1.ifc"
-    model = ios.open(inputFile)
-    
-    # Show element type selection dialog
-    if not select_element_types(model):
-        print("Element selection cancelled. Using all element types.")
+def convertIFCSPFtoTTL(inputFile, outputFile, workers=1, filters=None, stream_excel=False,
+                       table_format=None, incremental=False, iri_mode='timestamp',
+                       cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, geometry=None, type_nodes=None,
+                       guids=None, depth=1, partition=None, pipeline=False, checkpoint=False,
+                       resume=False, model=None):
+    """Convert an IFC file to TTL plus the Excel parameter table.
 
-    f = open(outputFile, "w", encoding='utf-8')
-    writeTTLFileContent(model,f)    
-    f.close()
-    
-    # Generate Excel file
-    excelFile = outputFile.replace('.ttl', '.xlsx')
-    generate_excel_output(excelFile)
+    With workers > 1 the entities are split into shards that are converted
+    by a process pool and merged back in the same order as the serial path.
+    filters ({element_filters key: bool}) skips the selection dialog, which
+    is what the headless batch mode uses. stream_excel writes the Excel
+    rows while converting instead of collecting them first. table_format
+    ('parquet', 'arrow', 'csv' or 'auto') also writes the property table in
+    that columnar format next to the TTL. incremental keeps a manifest of
+    entity hashes next to the outputs and, on the next run, only converts
+    the entities that were added or changed (see writeTTLFileContentIncremental).
+
+    iri_mode picks the instance namespace: 'timestamp' (a new one per run),
+    'content' (hash of the IFC file) or 'project' (hash of the IfcProject
+    GlobalId, stable across revisions). With cache_dir the outputs are
+    stored in a size-bounded LRU cache and returned from it when the same
+    file is converted again with the same options and converter code;
+    caching implies deterministic IRIs, so 'timestamp' becomes 'content'.
+
+    An outputFile ending in .nt or .nq is written as N-Triples or N-Quads
+    (named graph = the instance namespace) instead of Turtle.
+
+    geometry overrides includeGeometry: element bounding boxes, volumes and
+    surface areas from the tessellated shapes (see GeometryIndex).
+    type_nodes overrides deduplicateTypes: the psets of each type object are
+    written once on an inst:type_<id> node (props:ElementType) that the
+    instances link to with props:hasElementType, and the instances only
+    carry their own psets. rdf_loader.load_graph(..., expand_types=True)
+    copies them back onto the instances.
+
+    guids (a list of GlobalIds) only converts those products plus what is
+    reachable from them over containment and hosting relations within depth
+    steps, and their types, for a single-product passport (see collectTargets).
+
+    partition ('storey', 'category' or 'storey+category') also splits the
+    output into <name>.parts/ with a <name>.parts.json manifest (see
+    writePartitions). pipeline runs the single-process conversion as a
+    producer/consumer pipeline (see ConversionPipeline); it implies
+    stream_excel.
+
+    The RDF, Excel and table outputs are written to <file>.part and renamed
+    when complete, so readers never see a half-written file. checkpoint
+    commits the progress every CHECKPOINT_BATCH entities and resume
+    continues an interrupted checkpointed run (see ConversionJournal).
+
+    model is the already opened model of inputFile, if any. Progress and
+    cancellation go through state.progress (see progress_ui).
+    """
+    if geometry is not None:
+        state.includeGeometry = geometry
+    if type_nodes is not None:
+        state.deduplicateTypes = type_nodes
+    state.excel_data = PropertyTable()  # Reset for each conversion
+    state.output_format = outputFormat(outputFile)
+
+    if filters is None:
+        if model is None:
+            model = ios.open(inputFile)
+        # Show element type selection dialog
+        if not select_element_types(model):
+            print("Element selection cancelled. Using all element types.")
+    else:
+        state.element_filters.update(filters)
+
+    excelFile = os.path.splitext(outputFile)[0] + '.xlsx'
+    if table_format:
+        table_format = resolveTableFormat(table_format)
+    outputs = [outputFile, excelFile]
+    if table_format:
+        outputs.append(os.path.splitext(outputFile)[0] + "." + table_format)
+
+    cache = None
+    file_digest = None
+    if cache_dir and not incremental:
+        if iri_mode == 'timestamp':
+            iri_mode = 'content'
+        file_digest = fileDigest(inputFile)
+        cache = ConversionCache(cache_dir, cache_size)
+        cache_key = cache.key(file_digest, state.settings(), iri_mode, table_format, state.output_format,
+                              guids, depth)
+        if cache.restore(cache_key, outputs):
+            print(f"Outputs restored from the conversion cache ({cache_key[:12]})")
+            if partition:
+                if model is None and 'storey' in partition:
+                    model = ios.open(inputFile)
+                writePartitions(outputFile, partition, model)
+            return
+
+    if model is None:
+        reportPhase("Opening IFC model")
+        model = ios.open(inputFile)
+    state.property_schema = PropertySchema.load(PROPERTY_SCHEMA_FILE)
+    state.baseURI = instanceNamespace(model, inputFile, iri_mode, file_digest)
+
+    if guids and (incremental or workers > 1):
+        print("GUID-targeted extraction converts in a single, non-incremental pass")
+        incremental = False
+        workers = 1
+
+    previous = None
+    if incremental:
+        # Read the previous outputs before they are overwritten
+        previous = loadPreviousConversion(outputFile, excelFile)
+        if previous is not None:
+            state.baseURI = previous['baseURI']
+        if workers > 1:
+            print("Incremental mode converts in a single process")
+            workers = 1
+
+    journal = None
+    if checkpoint or resume:
+        if guids or incremental:
+            print("Checkpoints are only kept for full conversions")
+        else:
+            if workers > 1 or pipeline:
+                print("Checkpointed conversion runs in a single process")
+                workers = 1
+                pipeline = False
+            journal = ConversionJournal(outputFile, checkpointKey(inputFile, file_digest, iri_mode))
+            if resume and journal.resume():
+                state.baseURI = journal.baseURI
+                print(f"Resuming after {journal.done} entities")
+
+    # The pipeline replaces the plain single-process path only
+    pipeline = pipeline and not (guids or incremental or workers > 1)
+    stream_excel = stream_excel or pipeline
+
+    property_table = state.excel_data
+    if stream_excel:
+        excel_writer = StreamingExcelWriter(excelFile)
+        # The streamed workbook needs no copy of the rows unless a table is written too
+        state.excel_data = RowFanout(excel_writer, property_table) if table_format else excel_writer
+    if journal is not None:
+        # Rows of the entities a resumed run skips
+        state.excel_data.extend(journal.rows)
+        journal.rows = []
+
+    part_file = outputFile + ".part"
+    manifest = None
+    resuming = journal is not None and journal.done > 0
+    try:
+        # Large write buffer so the per-entity blocks reach the disk in big chunks
+        with open(part_file, "r+" if resuming else "w", encoding='utf-8', buffering=TTL_WRITE_BUFFER) as f:
+            if resuming:
+                f.seek(journal.offset)
+                f.truncate()
+            if guids:
+                writeTTLFileContentTargeted(model, f, guids, depth)
+            elif incremental:
+                manifest = writeTTLFileContentIncremental(model, f, outputFile, previous)
+            elif journal is not None:
+                writeTTLFileContentCheckpointed(model, f, journal)
+            elif workers > 1:
+                writeTTLFileContentParallel(inputFile, model, f, workers)
+            elif pipeline:
+                writeTTLFileContentPipelined(model, f)
+            else:
+                writeTTLFileContent(model, f)
+
+        # Generate Excel file
+        reportPhase("Writing Excel file")
+        if stream_excel:
+            excel_writer.close()
+        else:
+            generate_excel_output(excelFile)
+
+        if table_format:
+            write_property_table(property_table, os.path.splitext(outputFile)[0], table_format)
+    except BaseException:
+        if stream_excel:
+            excel_writer.discard()
+        # A checkpointed run keeps its partial output for resume
+        if journal is None and os.path.exists(part_file):
+            os.remove(part_file)
+        raise
+    os.replace(part_file, outputFile)
+    if manifest is not None:
+        saveJSONAtomically(manifestPath(outputFile), manifest)
+    if journal is not None:
+        journal.finish()
+
+    if partition:
+        writePartitions(outputFile, partition, model)
+
+    state.property_schema.save(PROPERTY_SCHEMA_FILE)
+    if cache:
+        cache.store(cache_key, outputs)
     
+def instanceNamespace(model, inputFile, iri_mode, file_digest=None):
+    """baseURI (the inst: namespace) for the iri_mode of convertIFCSPFtoTTL"""
+    if iri_mode == 'content':
+        return BASE_URI_PREFIX + "/" + (file_digest or fileDigest(inputFile))[:16] + "/"
+    elif iri_mode == 'project':
+        project_guid = model.by_type("IfcProject")[0].GlobalId
+        return BASE_URI_PREFIX + "/" + hashlib.sha256(project_guid.encode('utf-8')).hexdigest()[:16] + "/"
+    return BASE_URI_PREFIX + datetime.now().strftime('%Y%m%d_%H%M%S') + "/"
+
+def convertIFCtoGraph(inputFile, filters=None, iri_mode='timestamp', excelFile=None, graph=None):
+    """Convert an IFC file straight into an rdflib Graph, without writing Turtle.
+
+    Gives the same triples as parsing the output of convertIFCSPFtoTTL, so
+    in-process consumers (see map_to_ontology.convert_ifc_and_map) skip the
+    serialize/parse round trip. filters and iri_mode work as in
+    convertIFCSPFtoTTL; the Excel file is only written when excelFile is given.
+    """
+    state.excel_data = PropertyTable()
+
+    model = ios.open(inputFile)
+    if filters is None:
+        if not select_element_types(model):
+            print("Element selection cancelled. Using all element types.")
+    else:
+        state.element_filters.update(filters)
+
+    state.property_schema = PropertySchema.load(PROPERTY_SCHEMA_FILE)
+    state.baseURI = instanceNamespace(model, inputFile, iri_mode)
+
+    if graph is None:
+        graph = Graph()
+    for prefix, namespace in rdfPrefixes().items():
+        graph.bind(prefix, namespace)
+    buildModelIndexes(model)
+    emitter = GraphEmitter(graph)
+    emitter.header()
+    writeLBDinstances(model, emitter)
+
+    if excelFile:
+        generate_excel_output(excelFile)
+    state.property_schema.save(PROPERTY_SCHEMA_FILE)
+    return graph
+
+class LBDConverter:
+    """Re-entrant conversion API for long-lived processes.
+
+    A converter carries its own settings (the include* flags and element
+    filters that the GUI and CLI keep at module level) plus default
+    options for convertIFCSPFtoTTL. Every call runs on a fresh
+    ConversionState of the calling thread and puts the previous one back
+    afterwards, so converters can be used from many threads at the same
+    time and nested in other conversions:
+
+        converter = LBDConverter(filters={'zones': False}, geometry=True, iri_mode='content')
+        with ThreadPoolExecutor(4) as pool:
+            pool.map(converter.convert, ifc_files, ttl_files)
+    """
+
+    def __init__(self, filters=None, building_properties=True, quantities=True, geometry=False,
+                 materials=True, type_nodes=False, classification=True, **options):
+        self.filters = dict(filters or {})
+        self.settings = {
+            'includeBuildingProperties': building_properties,
+            'includeQuantities': quantities,
+            'includeGeometry': geometry,
+            'includeMaterials': materials,
+            'deduplicateTypes': type_nodes,
+            'includeClassification': classification,
+        }
+        self.options = options
+
+    def convert(self, inputFile, outputFile, **options):
+        """convertIFCSPFtoTTL with this converter's settings; options override the defaults"""
+        with self.activate():
+            convertIFCSPFtoTTL(inputFile, outputFile, filters=self.filters, **{**self.options, **options})
+
+    def to_graph(self, inputFile, **options):
+        """convertIFCtoGraph with this converter's settings"""
+        options = {key: value for key, value in {**self.options, **options}.items()
+                   if key in ('iri_mode', 'excelFile', 'graph')}
+        with self.activate():
+            return convertIFCtoGraph(inputFile, filters=self.filters, **options)
+
+    @contextmanager
+    def activate(self):
+        previous = state.snapshot()
+        state.__init__()
+        state.__dict__.update(copy.deepcopy(self.settings))
+        try:
+            yield state
+        finally:
+            state.restore(previous)
+
+def outputFormat(outputFile):
+    """RDF syntax for outputFile: 'nt' or 'nq' by extension, otherwise 'ttl'"""
+    extension = os.path.splitext(outputFile)[1].lower().lstrip('.')
+    return extension if extension in ('nt', 'nq') else 'ttl'
+
 def writeTTLFileContent(model, file):
-    file.write(writeTTLHeader())
-    file.write(writeLBDinstances(model,file))
+    buildModelIndexes(model)
+    emitter = createEmitter(file)
+    emitter.header()
+    writeLBDinstances(model, emitter)
+
+def writeTTLFileContentCheckpointed(model, file, journal):
+    """Serial conversion that commits a checkpoint every CHECKPOINT_BATCH entities
+    and skips the entities that a resumed journal has already done"""
+    buildModelIndexes(model)
+    emitter = createEmitter(file)
+    if journal.done == 0:
+        emitter.header()
+    rows = state.excel_data
+    state.excel_data = RowFanout(rows, journal)
+    journal.open()
+    try:
+        position = 0
+        for key, writer, label, entities in plannedCategories(model):
+            for entity in entities:
+                if position >= journal.done:
+                    writer(entity, emitter)
+                reportProgress()
+                position += 1
+                if position % CHECKPOINT_BATCH == 0 and position > journal.done:
+                    journal.commit(file, position)
+            print(f"  ✓ Processed {label}")
+        # Also committed at the end, so a failure while saving the Excel file resumes there
+        journal.commit(file, position)
+    finally:
+        journal.close()
+        state.excel_data = rows
+
+def checkpointKey(inputFile, file_digest, iri_mode):
+    """A checkpoint can only be resumed for the same input, settings and converter code"""
+    parts = [file_digest or fileDigest(inputFile), state.settings(), state.output_format, iri_mode,
+             converterVersion()]
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+class ConversionJournal:
+    """Progress journal of a checkpointed conversion.
+
+    Every commit flushes and fsyncs the partial RDF file (<output>.part) and
+    the Excel rows written so far (<name>.rows.jsonl), then atomically
+    replaces <name>.journal.json with the number of entities done and the
+    size of both files. A resumed run with the same key truncates both
+    files to the journaled sizes, reloads the rows and skips the entities
+    already done. The journal files are removed once the outputs are in
+    place.
+    """
+
+    def __init__(self, outputFile, key):
+        base = os.path.splitext(outputFile)[0]
+        self.path = base + ".journal.json"
+        self.rows_path = base + ".rows.jsonl"
+        self.part_path = outputFile + ".part"
+        self.key = key
+        self.done = 0
+        self.offset = 0
+        self.rows_offset = 0
+        self.baseURI = None
+        self.rows = []
+        self.rows_file = None
+
+    def resume(self):
+        """Load the journal of an interrupted run; False when there is nothing to resume"""
+        try:
+            with open(self.path, "r", encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print("No checkpoint found, converting the whole model")
+            return False
+        if data.get('key') != self.key or not os.path.exists(self.part_path) \
+                or os.path.getsize(self.part_path) < data['offset'] \
+                or not os.path.exists(self.rows_path) or os.path.getsize(self.rows_path) < data['rows_offset']:
+            print("Checkpoint does not match this input and settings, converting the whole model")
+            return False
+        self.done = data['done']
+        self.offset = data['offset']
+        self.rows_offset = data['rows_offset']
+        self.baseURI = data['baseURI']
+        with open(self.rows_path, "rb") as f:
+            self.rows = [json.loads(line) for line in f.read(self.rows_offset).splitlines()]
+        return True
+
+    def open(self):
+        if self.done:
+            os.truncate(self.rows_path, self.rows_offset)
+            self.rows_file = open(self.rows_path, "ab")
+        else:
+            self.rows_file = open(self.rows_path, "wb")
+
+    def append(self, data_row):
+        self.rows_file.write((json.dumps(data_row, ensure_ascii=False) + "\n").encode('utf-8'))
+
+    def extend(self, data_rows):
+        for data_row in data_rows:
+            self.append(data_row)
+
+    def commit(self, file, done):
+        for f in (file, self.rows_file):
+            f.flush()
+            os.fsync(f.fileno())
+        self.done = done
+        self.offset = file.tell()
+        self.rows_offset = self.rows_file.tell()
+        data = {'key': self.key, 'baseURI': state.baseURI, 'done': self.done,
+                'offset': self.offset, 'rows_offset': self.rows_offset}
+
+        def save(path):
+            with open(path, "w", encoding='utf-8') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+        saveAtomically(self.path, save)
+
+    def close(self):
+        if self.rows_file is not None:
+            self.rows_file.close()
+            self.rows_file = None
+
+    def finish(self):
+        self.close()
+        for path in (self.path, self.rows_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+def saveAtomically(path, save):
+    """Write path through save(<path>.part) and rename, so readers never see a partial file"""
+    temp_path = path + ".part"
+    try:
+        save(temp_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+
+def saveJSONAtomically(path, data, indent=None):
+    def save(temp_path):
+        with open(temp_path, "w", encoding='utf-8') as f:
+            json.dump(data, f, indent=indent)
+    saveAtomically(path, save)
+
+def writeTTLFileContentPipelined(model, file):
+    buildModelIndexes(model)
+    rows = state.excel_data
+    with ConversionPipeline(file, rows) as pipeline:
+        # The writers append their rows to the pipeline instead of the Excel sink
+        state.excel_data = pipeline.rows
+        try:
+            writeLBDinstances(model, pipeline.emitter)
+        finally:
+            state.excel_data = rows
+
+def writeTTLFileContentTargeted(model, file, guids, depth):
+    state.target_entities = collectTargets(model, guids, depth)
+    try:
+        buildModelIndexes(model, entities=list(state.target_entities.values()))
+        emitter = createEmitter(file)
+        emitter.header()
+        writeLBDinstances(model, emitter)
+    finally:
+        state.target_entities = None
+
+def collectTargets(model, guids, depth):
+    """The products with the given GlobalIds plus their neighbours within depth steps.
+
+    The products are found through the model's GUID lookup and only their
+    relations are followed (see relatedEntities), so the cost depends on the
+    size of the neighbourhood, not of the model. The type objects of the
+    selected entities are always added, since their psets belong to the
+    passport. Returns {id: entity}.
+    """
+    selected = {}
+    for guid in guids:
+        try:
+            entity = model.by_guid(guid)
+        except RuntimeError:
+            raise ValueError(f"No entity with GlobalId {guid}")
+        selected[entity.id()] = entity
+    frontier = list(selected.values())
+    for step in range(depth):
+        reached = []
+        for entity in frontier:
+            for related in relatedEntities(entity):
+                if related.id() not in selected:
+                    selected[related.id()] = related
+                    reached.append(related)
+        frontier = reached
+    for entity in list(selected.values()):
+        # IsTypedBy in IFC4, IsDefinedBy in IFC2X3
+        for name in ('IsTypedBy', 'IsDefinedBy'):
+            for rel in getattr(entity, name, None) or ():
+                if rel.is_a("IfcRelDefinesByType"):
+                    selected.setdefault(rel.RelatingType.id(), rel.RelatingType)
+    return selected
+
+def relatedEntities(entity):
+    """Spatial parent, host and hosted elements of entity"""
+    for rel in getattr(entity, 'ContainedInStructure', None) or ():
+        yield rel.RelatingStructure
+    for rel in getattr(entity, 'Decomposes', None) or ():
+        yield rel.RelatingObject
+    for rel in getattr(entity, 'FillsVoids', None) or ():
+        for voids in rel.RelatingOpeningElement.VoidsElements or ():
+            yield voids.RelatingBuildingElement
+    for rel in getattr(entity, 'HasOpenings', None) or ():
+        for fills in rel.RelatedOpeningElement.HasFillings or ():
+            yield fills.RelatedBuildingElement
+
+def fileDigest(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+converter_version = None
+
+def converterVersion():
+    """Hash of the converter source, so cached outputs expire when the code changes"""
+    global converter_version
+    if converter_version is None:
+        digest = hashlib.sha256()
+        for module_file in (__file__, Namespace.__file__):
+            with open(module_file, "rb") as f:
+                digest.update(f.read())
+        converter_version = digest.hexdigest()
+    return converter_version
+
+class ConversionCache:
+    """Content-addressed store of conversion outputs with LRU eviction.
+
+    Each entry is a folder named after the cache key holding one file per
+    output extension. Restoring an entry refreshes its modification time;
+    when the cache grows past max_bytes the least recently used entries
+    are removed.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, file_digest, settings, *options):
+        """settings: state.settings(); options: every other conversion option that changes the outputs"""
+        options = [file_digest, settings, *options, converterVersion()]
+        return hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def restore(self, key, outputs):
+        entry = os.path.join(self.directory, key)
+        cached = [os.path.join(entry, "output" + os.path.splitext(path)[1]) for path in outputs]
+        if not all(os.path.exists(path) for path in cached):
+            return False
+        for cached_file, path in zip(cached, outputs):
+            saveAtomically(path, lambda temp_path: shutil.copyfile(cached_file, temp_path))
+        os.utime(entry)
+        return True
+
+    def store(self, key, outputs):
+        entry = os.path.join(self.directory, key)
+        if os.path.exists(entry):
+            return
+        # Copy into a temporary folder first so a half-written entry is never visible
+        staging = tempfile.mkdtemp(prefix="tmp_", dir=self.directory)
+        for path in outputs:
+            if os.path.exists(path):
+                shutil.copyfile(path, os.path.join(staging, "output" + os.path.splitext(path)[1]))
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another process stored the same entry meanwhile
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            if name.startswith("tmp_") or not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, entry))
+            total += size
+        for mtime, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+# Subject prefix of the entities of each LBD category
+SUBJECT_PREFIXES = {
+    'sites': 'site_',
+    'buildings': 'building_',
+    'storeys': 'storey_',
+    'spaces': 'space_',
+    'elements': 'element_',
+    'interfaces': 'interface_',
+    'zones': 'zone_',
+    'types': 'type_',
+    'materials': 'material_',
+}
+
+def manifestPath(outputFile):
+    # Keyed on the full output name so x.ttl, x.nt and x.nq keep separate manifests.
+    return outputFile + ".manifest.json"
+
+def loadPreviousConversion(outputFile, excelFile):
+    """Manifest, TTL blocks and Excel rows of the previous incremental run.
+
+    Returns None when there is no usable previous run (no manifest or
+    outputs, or other settings or element filters), which makes the run a full one.
+    """
+    manifest_file = manifestPath(outputFile)
+    if not (os.path.exists(manifest_file) and os.path.exists(outputFile)):
+        print("No previous conversion found, converting the whole model")
+        return None
+    with open(manifest_file, "r", encoding='utf-8') as f:
+        manifest = json.load(f)
+    # Compared as stored, so tuples and lists in the filters are the same
+    if manifest.get('settings') != json.loads(json.dumps(state.settings())):
+        print("Settings or element filters changed since the previous conversion, converting the whole model")
+        return None
+
+    blocks = {subject: block for subject, block in readBlocks(outputFile, manifest['baseURI']) if subject}
+
+    rows = {}
+    if os.path.exists(excelFile):
+        wb = openpyxl.load_workbook(excelFile, read_only=True)
+        for values in wb.active.iter_rows(min_row=2, values_only=True):
+            data_row = {key: "" if value is None else str(value)
+                        for (header, key, width), value in zip(EXCEL_COLUMNS, values)}
+            rows.setdefault(data_row['Element_ID'], []).append(data_row)
+        wb.close()
+
+    return {'baseURI': manifest['baseURI'], 'entities': manifest['entities'],
+            'blocks': blocks, 'rows': rows}
+
+def readBlocks(outputFile, base_uri):
+    """(subject, text) of every block of a file written by the emitters.
+
+    Blocks are separated by one blank line; entity blocks start with
+    inst:<subject> (Turtle) or <baseURI><subject> (N-Triples/N-Quads), the
+    header blocks (prefixes, ontology statement) have subject "".
+    """
+    subject_iri = "<" + base_uri
+    with open(outputFile, "r", encoding='utf-8') as f:
+        lines = []
+        for line in f:
+            if line != "\n":
+                lines.append(line)
+                continue
+            subject = ""
+            if lines and lines[0].startswith("inst:") and not lines[0].startswith("inst: "):
+                subject = lines[0][5:].strip()
+            elif lines and lines[0].startswith(subject_iri):
+                subject = lines[0][len(subject_iri):].split(">", 1)[0]
+            if lines:
+                yield subject, "".join(lines) + "\n"
+            lines = []
+
+def readBaseURI(outputFile):
+    """baseURI of a file written by the emitters, from its first line"""
+    with open(outputFile, "r", encoding='utf-8') as f:
+        first = f.readline()
+    if first.startswith("# baseURI: "):
+        return first[len("# baseURI: "):].strip()
+    return first[1:].split(">", 1)[0]
+
+def partsManifestPath(outputFile):
+    return os.path.splitext(outputFile)[0] + ".parts.json"
+
+def writePartitions(outputFile, partition, model=None):
+    """Split a written TTL/NT/NQ file into one file per storey and/or LBD category.
+
+    partition is 'storey', 'category' or 'storey+category' ('storey' needs
+    the model). Storey partitions hold the storey with its spaces, elements,
+    element parts, hosted elements and space boundaries; everything else
+    (site, building, zones, types, materials, unplaced elements) goes to
+    'shared'. The files are written to <name>.parts/, each with the header
+    of the source file, and <name>.parts.json lists every partition with
+    its file, number of subjects and the partitions it links to (with the
+    number of distinct subjects referenced there), so consumers can load a
+    partition plus only what it depends on.
+    """
+    base, extension = os.path.splitext(outputFile)
+    parts_dir = base + ".parts"
+    manifest_file = partsManifestPath(outputFile)
+    # Partitions of the previous run that this one does not produce would be stale
+    if os.path.exists(manifest_file):
+        with open(manifest_file, "r", encoding='utf-8') as f:
+            for entry in json.load(f).get('partitions', []):
+                stale = os.path.join(parts_dir, entry['file'])
+                if os.path.exists(stale):
+                    os.remove(stale)
+    os.makedirs(parts_dir, exist_ok=True)
+
+    base_uri = readBaseURI(outputFile)
+    if extension.lower() in ('.nt', '.nq'):
+        reference = re.compile(re.escape("<" + base_uri) + r"([^>]+)>")
+    else:
+        reference = re.compile(r"inst:(\w+)")
+    categories = {prefix: key for key, prefix in SUBJECT_PREFIXES.items()}
+    storeys = storeyAssignment(model) if 'storey' in partition else {}
+
+    header = []
+    files = {}
+    counts = {}
+    located = {}     # subject -> partition
+    references = {}  # partition -> subjects it links to
+    try:
+        for subject, block in readBlocks(outputFile, base_uri):
+            if not subject:
+                header.append(block)
+                continue
+            prefix, entity_id = subject.rsplit("_", 1)
+            name = partitionName(categories.get(prefix + "_", "shared"),
+                                 storeys.get(int(entity_id)) if entity_id.isdigit() else None, partition)
+            if name not in files:
+                files[name] = open(os.path.join(parts_dir, name + extension + ".part"), "w", encoding='utf-8')
+                files[name].write("".join(header))
+                counts[name] = 0
+            files[name].write(block)
+            counts[name] += 1
+            located[subject] = name
+            references.setdefault(name, set()).update(reference.findall(block))
+    except BaseException:
+        for f in files.values():
+            f.close()
+            os.remove(f.name)
+        raise
+    for name, f in files.items():
+        f.close()
+        os.replace(f.name, os.path.join(parts_dir, name + extension))
+
+    partitions = []
+    for name in sorted(files):
+        linked = {}
+        for subject in references[name]:
+            target = located.get(subject)
+            if target is not None and target != name:
+                linked[target] = linked.get(target, 0) + 1
+        partitions.append({'name': name, 'file': name + extension, 'subjects': counts[name],
+                           'references': dict(sorted(linked.items()))})
+    saveJSONAtomically(manifest_file, {'source': os.path.basename(outputFile), 'baseURI': base_uri,
+                                       'partition': partition, 'partitions': partitions}, indent=2)
+    print(f"  ✓ Wrote {len(partitions)} partition(s) to {parts_dir}")
+
+def partitionName(category, storey_id, partition):
+    storey = "storey_" + str(storey_id) if storey_id is not None else "shared"
+    if partition == 'storey':
+        return storey
+    if partition == 'category':
+        return category
+    return storey + "_" + category
+
+def storeyAssignment(model):
+    """Entity id -> id of the storey it belongs to, following aggregation,
+    containment and hosting down from every storey (not into nested storeys)"""
+    index = RelationshipIndex(model)
+    storey_ids = [storey.id() for storey in model.by_type("IfcBuildingStorey")]
+    assignment = {}
+    for storey_id in storey_ids:
+        assignment[storey_id] = storey_id
+    for storey_id in storey_ids:
+        stack = [storey_id]
+        while stack:
+            eid = stack.pop()
+            for adjacency in (index.decomposes, index.contains, index.hosts):
+                for child in adjacency.get(eid, ()):
+                    if child not in assignment:
+                        assignment[child] = storey_id
+                        stack.append(child)
+    for rel in model.by_type("IfcRelSpaceBoundary"):
+        if rel.RelatingSpace is not None and rel.RelatingSpace.id() in assignment:
+            assignment[rel.id()] = assignment[rel.RelatingSpace.id()]
+    return assignment
+
+def entityFingerprint(entity):
+    """Hash of everything the writers read for entity: attributes, psets and relationships"""
+    eid = entity.id()
+    if not entity.is_a("IfcRoot"):
+        # Material nodes: their own attributes (child nodes by id) and psets
+        parts = [entity.is_a(), eid, str(entity), state.material_index.properties.get(eid)]
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    parts = [entity.is_a(), eid, entity.GlobalId, entity.Name, entity.Description,
+             state.relationship_index.decomposes.get(eid), state.relationship_index.contains.get(eid),
+             state.relationship_index.bounds.get(eid), state.relationship_index.hosts.get(eid),
+             state.includeMaterials and state.material_index.get(entity)]
+    if entity.is_a("IfcRelSpaceBoundary"):
+        parts += [related.id() if related is not None else None
+                  for related in (entity.RelatingSpace, entity.RelatedBuildingElement)]
+    elif entity.is_a("IfcTypeObject"):
+        parts += [state.pset_index.getType(entity), state.pset_index.getType(entity, quantities=True)]
+    else:
+        parts += [state.pset_index.get(entity), state.pset_index.get(entity, quantities=True),
+                  state.deduplicateTypes and state.pset_index.types.get(eid)]
+    if state.geometry_index is not None:
+        parts.append(state.geometry_index.get(entity))
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+def writeTTLFileContentIncremental(model, file, outputFile, previous):
+    """Write the TTL, reusing the previous output for unchanged entities.
+
+    Every entity is fingerprinted and compared, by GlobalId, with the
+    manifest of the previous run. Unchanged entities get their previous
+    TTL block and Excel rows copied; only added and changed entities go
+    through the writers. These are also written to <name>.delta.<ext>, and
+    <name>.delta.json lists the added, changed and removed GlobalIds.
+    Returns the manifest of this run, which replaces the previous one.
+    """
+    buildModelIndexes(model)
+    emitter = createEmitter(file)
+    emitter.header()
+    # Changed entities are rendered once and written to both the TTL and the delta
+    block = io.StringIO()
+    block_emitter = createEmitter(block)
+    previous_entities = previous['entities'] if previous else {}
+    entities = {}
+    delta = {'added': [], 'changed': [], 'removed': []}
+
+    base, extension = os.path.splitext(outputFile)
+    delta_path = base + ".delta" + extension
+    delta_file = open(delta_path + ".part", "w", encoding='utf-8') if previous else None
+    if delta_file:
+        createEmitter(delta_file).header()
+
+    for key, writer, label, category_entities in plannedCategories(model):
+        for entity in category_entities:
+            reportProgress()
+            subject = SUBJECT_PREFIXES[key] + str(entity.id())
+            fingerprint = entityFingerprint(entity)
+            # Materials have no GlobalId and are tracked by their subject
+            guid = getattr(entity, 'GlobalId', None) or subject
+            entities[guid] = [subject, fingerprint]
+
+            before = previous_entities.get(guid)
+            if before == [subject, fingerprint] and subject in previous['blocks']:
+                file.write(previous['blocks'][subject])
+                state.excel_data.extend(previous['rows'].get(subject, ()))
+                continue
+
+            block.seek(0)
+            block.truncate()
+            writer(entity, block_emitter)
+            file.write(block.getvalue())
+            if delta_file:
+                delta_file.write(block.getvalue())
+                delta['added' if before is None else 'changed'].append(guid)
+        print(f"  ✓ Processed {label}")
+
+    if delta_file:
+        delta_file.close()
+        os.replace(delta_path + ".part", delta_path)
+        delta['removed'] = [guid for guid in previous_entities if guid not in entities]
+        saveJSONAtomically(base + ".delta.json", delta, indent=2)
+        print(f"Delta: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+              f"{len(delta['removed'])} removed ({delta_path})")
+
+    # Saved by convertIFCSPFtoTTL once the outputs it describes are in place
+    return {'baseURI': state.baseURI, 'settings': state.settings(), 'entities': entities}
+
+def buildModelIndexes(model, geometry_shapes=None, entities=None):
+    """Run the one-pass scans that the per-entity writers read from.
+
+    With entities the scans only cover the relations of those entities
+    (GUID-targeted extraction) instead of the whole model. Otherwise the
+    property sets and shapes are only read for the entities that pass the
+    category and class filters (see filteredEntities), and only their
+    materials (or those of their types) are written.
+    """
+    reportPhase("Indexing model")
+    selected = entities if entities is not None else filteredEntities(model)
+    state.pset_index = PropertySetIndex(model, selected)
+    state.relationship_index = RelationshipIndex(model, selected)
+    state.geometry_index = GeometryIndex(model, geometry_shapes, selected) if state.includeGeometry else None
+    state.material_index = MaterialIndex(model, materialScope(selected)) if state.includeMaterials else None
+    state.element_classes = elementClassTable(model.schema)
+
+# Categories linked by the topology relations (see RelationshipIndex)
+TOPOLOGY_CATEGORIES = ('sites', 'buildings', 'storeys', 'spaces', 'elements', 'interfaces', 'zones')
+
+def filteredEntities(model):
+    """Entities of the enabled categories when a topology category is switched
+    off or the elements are narrowed by the class filters, None when everything
+    is converted"""
+    filters = state.element_filters
+    if all(categoryEnabled(key) for key in TOPOLOGY_CATEGORIES) and \
+            not (filters.get('include_classes') or filters.get('exclude_classes')):
+        return None
+    entities = []
+    for key, ifc_class, writer, label in LBD_CATEGORIES:
+        if key != 'materials' and categoryEnabled(key):
+            entities.extend(selectEntities(model, key, ifc_class))
+    return entities
+
+def materialScope(entities):
+    """entities plus their type objects, whose materials the elements inherit"""
+    if entities is None:
+        return None
+    types = {}
+    for entity in entities:
+        type_object = get_type(entity) if entity.is_a("IfcObject") else None
+        if type_object is not None:
+            types[type_object.id()] = type_object
+    for entity in entities:
+        types.pop(entity.id(), None)
+    return list(entities) + [types[i] for i in sorted(types)]
+
+# Roots of the BEO and MEP class trees; IfcBuiltElement is IFC4X3's IfcBuildingElement
+CLASSIFICATION_ROOTS = [('IfcBuildingElement', 'beo'), ('IfcBuiltElement', 'beo'),
+                        ('IfcDistributionElement', 'mep')]
+
+# Schema name -> class table, so each schema is only walked once per process
+element_class_tables = {}
+
+def elementClassTable(schema):
+    """IFC class -> BEO/MEP class (e.g. IfcWallStandardCase -> beo:Wall) for schema.
+
+    Concrete subtypes of the CLASSIFICATION_ROOTS map to their own name
+    without "Ifc"; abstract classes and the StandardCase/ElementedCase
+    variants inherit the class of their nearest mapped supertype. Classes
+    outside the BEO/MEP trees are not in the table.
+    """
+    table = element_class_tables.get(schema)
+    if table is None:
+        table = element_class_tables[schema] = {}
+        declarations = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema)
+        for root, prefix in CLASSIFICATION_ROOTS:
+            try:
+                declaration = declarations.declaration_by_name(root)
+            except RuntimeError:
+                # Root not in this schema
+                continue
+            stack = [(declaration, None)]
+            while stack:
+                declaration, inherited = stack.pop()
+                name = declaration.name()
+                if not declaration.is_abstract() and not name.endswith(("StandardCase", "ElementedCase")):
+                    inherited = prefix + ":" + name[3:]
+                if inherited is not None:
+                    table[name] = inherited
+                stack.extend((subtype, inherited) for subtype in declaration.subtypes())
+    return table
+
+def scanType(model, ifc_class, entities=None):
+    """model.by_type(ifc_class), or with entities only the instances that reference one of them"""
+    if entities is None:
+        return model.by_type(ifc_class)
+    found = {}
+    for entity in entities:
+        for referrer in model.get_inverse(entity):
+            if referrer.is_a(ifc_class):
+                found[referrer.id()] = referrer
+    # File order, like by_type
+    return [found[i] for i in sorted(found)]
+
+# Quantity class -> project unit type of its value (counts and numbers have no unit)
+QUANTITY_UNIT_TYPES = {
+    'IfcQuantityLength': 'LENGTHUNIT',
+    'IfcQuantityArea': 'AREAUNIT',
+    'IfcQuantityVolume': 'VOLUMEUNIT',
+    'IfcQuantityWeight': 'MASSUNIT',
+    'IfcQuantityTime': 'TIMEUNIT',
+}
+
+class PropertySetIndex:
+    """Property sets of every object, collected in one pass over the model.
+
+    Gives the same result as get_psets(entity) without walking the inverse
+    IsDefinedBy/IsTypedBy relations of each entity. Every property set
+    definition is read once, and the property sets of a type object are
+    merged once and shared by all of its occurrences. The returned dicts
+    are shared between entities and must not be modified.
+
+    Quantity sets (IfcElementQuantity) come from the same scan but are kept
+    apart: get(entity, quantities=True) returns them as
+    {qset name: {quantity name: (value, unit symbol)}}, with the unit taken
+    from the quantity or else from the project units.
+
+    The pset_patterns and property_patterns of element_filters are applied
+    here, so filtered sets and properties are never read. With entities only
+    the relations of those entities are scanned.
+    """
+
+    def __init__(self, model, entities=None):
+        self.definitions = {}  # definition id -> (pset name, properties)
+        self.quantity_sets = set()  # ids of the definitions that are quantity sets
+        self.occurrences = {}  # object id -> [definition id, ...]
+        self.types = {}        # object id -> type object id
+        self.type_psets = {}   # type object id -> ({pset name: properties}, {qset name: quantities})
+        self.units = {unit_type: ifcopenshell.util.unit.get_project_unit(model, unit_type)
+                      for unit_type in set(QUANTITY_UNIT_TYPES.values())}
+        self.pset_filter = compilePatterns(state.element_filters.get('pset_patterns'))
+        self.property_filter = compilePatterns(state.element_filters.get('property_patterns'))
+
+        for rel in scanType(model, "IfcRelDefinesByProperties", entities):
+            definition_ids = [self.addDefinition(d) for d in unpackDefinitions(rel.RelatingPropertyDefinition)]
+            for obj in rel.RelatedObjects:
+                self.occurrences.setdefault(obj.id(), []).extend(definition_ids)
+
+        for rel in scanType(model, "IfcRelDefinesByType", entities):
+            type_object = rel.RelatingType
+            self.getType(type_object)
+            for obj in rel.RelatedObjects:
+                self.types[obj.id()] = type_object.id()
+
+    def getType(self, type_object, quantities=False):
+        """Property sets (or quantity sets) of a type object itself"""
+        if type_object.id() not in self.type_psets:
+            psets, qsets = {}, {}
+            for definition in type_object.HasPropertySets or []:
+                definition_id = self.addDefinition(definition)
+                self.mergeDefinition(qsets if definition_id in self.quantity_sets else psets, definition_id)
+            self.type_psets[type_object.id()] = (psets, qsets)
+        return self.type_psets[type_object.id()][quantities]
+
+    def addDefinition(self, definition):
+        if definition.id() not in self.definitions:
+            if definition.is_a("IfcElementQuantity"):
+                self.quantity_sets.add(definition.id())
+            if self.pset_filter and not self.pset_filter.match(definition.Name or ""):
+                self.definitions[definition.id()] = (definition.Name, {})
+            elif definition.is_a("IfcElementQuantity"):
+                quantities = {}
+                self.readQuantities(definition.Quantities, quantities)
+                self.definitions[definition.id()] = (definition.Name, quantities)
+            else:
+                self.definitions[definition.id()] = (definition.Name, self.readProperties(definition))
+        return definition.id()
+
+    def readProperties(self, definition):
+        if self.property_filter is None:
+            return get_property_definition(definition)
+        if definition.is_a("IfcPropertySet"):
+            # Only the matching properties are converted to values
+            properties = get_properties([p for p in definition.HasProperties
+                                         if self.property_filter.match(p.Name)])
+            properties["id"] = definition.id()
+            return properties
+        return {name: value for name, value in get_property_definition(definition).items()
+                if name == "id" or self.property_filter.match(name)}
+
+    def readQuantities(self, items, quantities):
+        for quantity in items or ():
+            if quantity.is_a("IfcPhysicalComplexQuantity"):
+                self.readQuantities(quantity.HasQuantities, quantities)
+                continue
+            if self.property_filter and not self.property_filter.match(quantity.Name):
+                continue
+            unit = quantity.Unit or self.units.get(QUANTITY_UNIT_TYPES.get(quantity.is_a()))
+            symbol = ifcopenshell.util.unit.get_unit_symbol(unit) if unit is not None else ""
+            # Name, Description, Unit, then the measure value
+            quantities[quantity.Name] = (quantity[3], symbol)
+
+    def mergeDefinition(self, psets, definition_id):
+        name, properties = self.definitions[definition_id]
+        if name in psets:
+            # Occurrence values override the type values of the same pset
+            merged = dict(psets[name])
+            merged.update(properties)
+            psets[name] = merged
+        else:
+            psets[name] = properties
+
+    def get(self, entity, quantities=False, inherit=True):
+        """Property sets (or quantity sets) of entity, including the ones inherited
+        from its type unless inherit is False"""
+        type_id = self.types.get(entity.id()) if inherit else None
+        inherited = self.type_psets[type_id][quantities] if type_id is not None else {}
+        definition_ids = [definition_id for definition_id in self.occurrences.get(entity.id(), ())
+                          if (definition_id in self.quantity_sets) == quantities]
+        if not definition_ids:
+            return inherited
+        psets = dict(inherited)
+        for definition_id in definition_ids:
+            self.mergeDefinition(psets, definition_id)
+        return psets
+
+class MaterialIndex:
+    """Material associations and the material nodes they reference, in one scan.
+
+    Every material definition reachable from IfcRelAssociatesMaterial (sets,
+    layers, constituents, profiles, lists and the IfcMaterials they use) is
+    resolved once and memoized by entity id, so the work grows with the
+    number of distinct materials, not with the number of elements. Layer
+    and profile set usages resolve to their set.
+
+    associations: object id -> material node id
+    nodes:        material node id -> entity, in first-reference order
+    properties:   material id -> {pset name: properties}
+
+    With entities only the materials of those entities are resolved.
+    """
+
+    def __init__(self, model, entities=None):
+        self.model = model
+        self.associations = {}
+        self.nodes = {}
+        self.properties = {}
+        self.types = {}
+        for rel in scanType(model, "IfcRelAssociatesMaterial", entities):
+            material_id = self.resolve(rel.RelatingMaterial)
+            for obj in rel.RelatedObjects:
+                self.associations[obj.id()] = material_id
+        for rel in scanType(model, "IfcRelDefinesByType", entities):
+            for obj in rel.RelatedObjects:
+                self.types[obj.id()] = rel.RelatingType.id()
+
+        pset_filter = compilePatterns(state.element_filters.get('pset_patterns'))
+        property_filter = compilePatterns(state.element_filters.get('property_patterns'))
+        # IfcMaterialProperties (IFC4) / IfcExtendedMaterialProperties and friends (IFC2X3)
+        materials = None if entities is None else list(self.nodes.values())
+        for definition in scanType(model, "IfcMaterialProperties", materials):
+            if definition.Material is None or definition.Material.id() not in self.nodes:
+                continue
+            name = getattr(definition, 'Name', None) or definition.is_a()
+            if pset_filter and not pset_filter.match(name):
+                continue
+            properties = get_property_definition(definition)
+            if property_filter:
+                properties = {prop: value for prop, value in properties.items()
+                              if prop == "id" or property_filter.match(prop)}
+            self.properties.setdefault(definition.Material.id(), {})[name] = properties
+
+    def resolve(self, material):
+        if material.is_a("IfcMaterialLayerSetUsage"):
+            material = material.ForLayerSet
+        elif material.is_a("IfcMaterialProfileSetUsage"):
+            material = material.ForProfileSet
+        if material.id() not in self.nodes:
+            self.nodes[material.id()] = material
+            for child in materialChildren(material):
+                self.resolve(child)
+        return material.id()
+
+    def get(self, entity):
+        """Material node id of entity, or of its type object when it has none itself"""
+        material_id = self.associations.get(entity.id())
+        if material_id is None and entity.id() in self.types:
+            material_id = self.associations.get(self.types[entity.id()])
+        return material_id
+
+def materialChildren(material):
+    """Material definitions that a material set, layer, constituent or profile refers to"""
+    if material.is_a("IfcMaterialLayerSet"):
+        return material.MaterialLayers
+    if material.is_a("IfcMaterialConstituentSet"):
+        return material.MaterialConstituents or ()
+    if material.is_a("IfcMaterialProfileSet"):
+        return material.MaterialProfiles
+    if material.is_a("IfcMaterialList"):
+        return material.Materials
+    if material.is_a("IfcMaterial"):
+        return ()
+    # Layer, constituent or profile
+    return (material.Material,) if material.Material is not None else ()
+
+class RelationshipIndex:
+    """Parent -> children adjacency of the topology relations, in one scan.
+
+    decomposes: IfcRelAggregates (IsDecomposedBy)
+    contains:   IfcRelContainedInSpatialStructure (ContainsElements)
+    bounds:     IfcRelSpaceBoundary, space -> building element (BoundedBy)
+    hosts:      IfcRelVoidsElement + IfcRelFillsElement, host -> filling
+
+    Each adjacency maps a parent id to a tuple of child ids without
+    duplicates, in the order the relations appear in the model. With
+    entities only the relations among those entities are kept, so no link
+    points at an entity that is not converted (see includes).
+    """
+
+    def __init__(self, model, entities=None):
+        decomposes = {}
+        contains = {}
+        bounds = {}
+        hosts = {}
+        fillings = {}
+
+        # IFC2X3 also reports IfcRelNests under IsDecomposedBy
+        decompose_class = "IfcRelDecomposes" if model.schema == "IFC2X3" else "IfcRelAggregates"
+        for rel in scanType(model, decompose_class, entities):
+            for obj in rel.RelatedObjects:
+                addEdge(decomposes, rel.RelatingObject.id(), obj.id())
+
+        for rel in scanType(model, "IfcRelContainedInSpatialStructure", entities):
+            for element in rel.RelatedElements:
+                addEdge(contains, rel.RelatingStructure.id(), element.id())
+
+        for rel in scanType(model, "IfcRelSpaceBoundary", entities):
+            if rel.RelatingSpace is not None and rel.RelatedBuildingElement is not None:
+                addEdge(bounds, rel.RelatingSpace.id(), rel.RelatedBuildingElement.id())
+
+        for rel in scanType(model, "IfcRelFillsElement", entities):
+            addEdge(fillings, rel.RelatingOpeningElement.id(), rel.RelatedBuildingElement.id())
+        for rel in scanType(model, "IfcRelVoidsElement", entities):
+            for filler in fillings.get(rel.RelatedOpeningElement.id(), ()):
+                addEdge(hosts, rel.RelatingBuildingElement.id(), filler)
+
+        keep = None if entities is None else {e.id() for e in entities}
+        self.keep = keep
+        self.decomposes = freezeAdjacency(decomposes, keep)
+        self.contains = freezeAdjacency(contains, keep)
+        self.bounds = freezeAdjacency(bounds, keep)
+        self.hosts = freezeAdjacency(hosts, keep)
+
+    def includes(self, entity):
+        """Whether entity is converted, for links read from entity attributes"""
+        return self.keep is None or entity.id() in self.keep
+
+def addEdge(adjacency, parent, child):
+    # Dicts keep insertion order, so they double as ordered sets
+    adjacency.setdefault(parent, {})[child] = None
+
+def freezeAdjacency(adjacency, keep=None):
+    if keep is None:
+        return {parent: tuple(children) for parent, children in adjacency.items()}
+    # Links to entities outside the selection would dangle
+    return {parent: tuple(c for c in children if c in keep)
+            for parent, children in adjacency.items() if parent in keep}
+
+def unpackDefinitions(definition):
+    # IfcPropertySetDefinitionSet wraps a list of property set definitions
+    if definition.is_a("IfcPropertySetDefinitionSet"):
+        return definition.wrappedValue
+    return (definition,)
+
+class GeometryIndex:
+    """Bounding box, volume and surface area of every element with a representation.
+
+    Shapes are tessellated by ifcopenshell's geometry iterator on
+    GEOMETRY_THREADS threads, in world coordinates and SI units (m, m², m³).
+    Results are cached in GEOMETRY_CACHE_FILE by GlobalId plus a content
+    hash of the representation and placement, so re-runs on an unchanged
+    model do not tessellate again. shapes ({element id: shape}) reuses the
+    shapes computed by another process instead. With entities only those
+    elements are tessellated.
+    """
+
+    def __init__(self, model, shapes=None, entities=None):
+        if shapes is not None:
+            self.shapes = shapes
+            return
+        self.shapes = {}
+        candidates = model.by_type("IfcElement") if entities is None else entities
+        elements = [e for e in candidates if e.is_a("IfcElement") and e.Representation]
+        memo = {}
+        keys = {e.id(): e.GlobalId + ":" + representationHash(e, memo) for e in elements}
+
+        os.makedirs(os.path.dirname(GEOMETRY_CACHE_FILE), exist_ok=True)
+        with sqlite3.connect(GEOMETRY_CACHE_FILE, timeout=60) as db:
+            db.execute("CREATE TABLE IF NOT EXISTS shapes (key TEXT PRIMARY KEY, shape TEXT)")
+            missing = []
+            for element in elements:
+                row = db.execute("SELECT shape FROM shapes WHERE key = ?", (keys[element.id()],)).fetchone()
+                if row is None:
+                    missing.append(element)
+                elif row[0] != "null":
+                    self.shapes[element.id()] = tuple(json.loads(row[0]))
+
+            computed = self.tessellate(model, missing) if missing else {}
+            self.shapes.update(computed)
+            # Elements without a usable body are stored too, so they are not retried
+            db.executemany("INSERT OR REPLACE INTO shapes VALUES (?, ?)",
+                           [(keys[e.id()], json.dumps(computed.get(e.id()))) for e in missing])
+        print(f"  ✓ Geometry: {len(elements) - len(missing)} cached, {len(missing)} tessellated")
+
+    @staticmethod
+    def tessellate(model, elements):
+        settings = ifcopenshell.geom.settings()
+        settings.set("use-world-coords", True)
+        iterator = ifcopenshell.geom.iterator(settings, model, GEOMETRY_THREADS, include=elements)
+        shapes = {}
+        if iterator.initialize():
+            while True:
+                shape = iterator.get()
+                verts = np.array(shape.geometry.verts).reshape(-1, 3)
+                if len(verts):
+                    bbox = list(verts.min(axis=0)) + list(verts.max(axis=0))
+                    shapes[shape.id] = tuple(round(float(v), 6) for v in bbox + [
+                        ifcopenshell.util.shape.get_volume(shape.geometry),
+                        ifcopenshell.util.shape.get_area(shape.geometry)])
+                if not iterator.next():
+                    break
+        return shapes
+
+    def get(self, entity):
+        """(min x, min y, min z, max x, max y, max z, volume, area) or None"""
+        return self.shapes.get(entity.id())
+
+def representationHash(element, memo):
+    """Hash of the geometry input of element, independent of the STEP ids"""
+    parts = [contentHash(element.Representation, memo), contentHash(element.ObjectPlacement, memo),
+             ios.version]
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+def contentHash(value, memo):
+    # Shared items (placements, representation maps) are hashed once per model
+    if isinstance(value, ios.entity_instance):
+        eid = value.id()
+        if eid in memo:
+            return memo[eid]
+        parts = [value.is_a()] + [contentHash(attribute, memo) for attribute in value]
+        digest = hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+        if eid:
+            memo[eid] = digest
+        return digest
+    if isinstance(value, (tuple, list)):
+        return "(" + ",".join(contentHash(v, memo) for v in value) + ")"
+    return repr(value)
+
+def planShards(model, workers):
+    """Split the enabled categories into (key, start, stop) slices of by_type()"""
+    shards = []
+    for key, ifc_class, writer, label in LBD_CATEGORIES:
+        if not categoryEnabled(key):
+            continue
+        count = len(selectEntities(model, key, ifc_class))
+        size = max(SHARD_MIN_SIZE, -(-count // (workers * SHARDS_PER_WORKER)))
+        for start in range(0, count, size):
+            shards.append((key, start, min(start + size, count)))
+    return shards
+
+def writeTTLFileContentParallel(inputFile, model, file, workers):
+    """Convert the shards in a process pool and merge them deterministically.
+
+    Every worker opens the IFC file itself and writes its shard to a partial
+    TTL file. The partial files and their Excel rows are appended in shard
+    order, which gives the same output as writeTTLFileContent.
+    """
+    shards = planShards(model, workers)
+    # Tessellate once here; the workers get the shapes instead of the cache lookups
+    geometry_shapes = GeometryIndex(model, entities=filteredEntities(model)).shapes if state.includeGeometry else None
+    labels = {key: label for key, ifc_class, writer, label in LBD_CATEGORIES}
+    last_shard = {key: i for i, (key, start, stop) in enumerate(shards)}
+    reportPhase("Converting entities", sum(stop - start for key, start, stop in shards))
+
+    emitter = createEmitter(file)
+    emitter.header()
+    with tempfile.TemporaryDirectory(prefix="ifctolbd_") as part_dir:
+        jobs = [(i, shard, part_dir) for i, shard in enumerate(shards)]
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=initShardWorker,
+                                 initargs=(inputFile, state.baseURI, state.settings(),
+                                           state.output_format, geometry_shapes)) as pool:
+            # map() yields the results in submission order
+            for i, (part_file, rows) in enumerate(pool.map(convertShard, jobs)):
+                with open(part_file, "r", encoding='utf-8') as part:
+                    shutil.copyfileobj(part, file)
+                os.remove(part_file)
+                state.excel_data.extend(rows)
+                key, start, stop = shards[i]
+                reportProgress(stop - start)
+                if last_shard[key] == i:
+                    print(f"  ✓ Processed {labels[key]}")
+
+# IFC model opened by each worker process of writeTTLFileContentParallel
+shard_model = None
+# Category key -> selectEntities() of shard_model, shared by the shards of a worker
+shard_entities = {}
+
+def initShardWorker(inputFile, base_uri, settings, rdf_format, geometry_shapes):
+    global shard_model
+    state.__dict__.update(settings)
+    state.baseURI = base_uri
+    state.output_format = rdf_format
+    state.property_schema = PropertySchema.load(PROPERTY_SCHEMA_FILE)
+    shard_model = ios.open(inputFile)
+    shard_entities.clear()
+    buildModelIndexes(shard_model, geometry_shapes)
+
+def convertShard(job):
+    """Write one shard to its own partial TTL file and return its Excel rows"""
+    index, (key, start, stop), part_dir = job
+    ifc_class, writer = next((c, w) for k, c, w, l in LBD_CATEGORIES if k == key)
+    state.excel_data = PropertyTable()
+    part_file = os.path.join(part_dir, "part_%06d.%s" % (index, state.output_format))
+    with open(part_file, "w", encoding='utf-8', buffering=TTL_WRITE_BUFFER) as f:
+        emitter = createEmitter(f)
+        if key not in shard_entities:
+            shard_entities[key] = selectEntities(shard_model, key, ifc_class)
+        for entity in shard_entities[key][start:stop]:
+            writer(entity, emitter)
+    return part_file, state.excel_data
+
+class TurtleEmitter:
+    """Streams LBD instances to a file-like sink one subject block at a time.
+
+    Only the statements of the subject that is currently being written are
+    kept in memory, so peak memory stays flat regardless of the model size.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.subject = None
+        self.statements = []
+
+    def header(self):
+        self.sink.write(writeTTLHeader())
+
+    def start(self, subject, rdf_type):
+        """Open the block of inst:<subject> with its rdf:type"""
+        self.subject = subject
+        self.statements = [("a", rdf_type, None)]
+
+    def iri(self, predicate, obj):
+        """Add a statement whose object is a prefixed name (e.g. inst:space_12)"""
+        self.statements.append((predicate, obj, None))
+
+    def literal(self, predicate, value, datatype):
+        """Add a statement whose object is a literal typed as xsd:<datatype>"""
+        self.statements.append((predicate, value, datatype))
 
-def print_properties(properties, output, element_id="", element_type="", element_name=""):    
-    global excel_data
-    for name, value in properties.items():   
-        if name == "id":
+    def quantity(self, predicate, value, unit):
+        """Add a statement whose object is a qudt:QuantityValue (blank node) with
+        value as xsd:double and unit from the QUDT unit vocabulary (e.g. M3)"""
+        self.statements.append((predicate, (value, unit), QUANTITY_VALUE))
+
+    def end(self):
+        """Write the current block to the sink and release it"""
+        self.sink.write(formatTurtleBlock(self.subject, self.statements))
+        self.subject = None
+        self.statements = []
+
+# Datatype slot of a statement added by TurtleEmitter.quantity
+QUANTITY_VALUE = "qudt:QuantityValue"
+
+class NTriplesEmitter(TurtleEmitter):
+    """Writes the statements of TurtleEmitter as N-Triples, or as N-Quads
+    when a graph IRI is given.
+
+    Every statement is one line with full IRIs, so the output can be split
+    at any line (and shards simply concatenated) and loaded with a
+    line-based parser instead of the Turtle parser. Subject blocks are
+    still separated by a blank line.
+    """
+
+    def __init__(self, sink, graph=None):
+        super().__init__(sink)
+        self.prefixes = rdfPrefixes()
+        self.context = " <" + graph + ">" if graph else ""
+        self.terms = {"a": "<" + Namespace.RDF + "type>"}
+
+    def header(self):
+        self.sink.write("<" + state.baseURI + "> " + self.term("rdf:type") + " <" + Namespace.OWL
+                        + "Ontology>" + self.context + " .\n\n")
+
+    def term(self, name):
+        """Expand a prefixed name (e.g. bot:Element) to <IRI>, memoized"""
+        iri = self.terms.get(name)
+        if iri is None:
+            prefix, local = name.split(":", 1)
+            iri = self.terms[name] = "<" + self.prefixes[prefix] + local + ">"
+        return iri
+
+    def end(self):
+        subject = "<" + state.baseURI + self.subject + "> "
+        lines = []
+        for predicate, obj, datatype in self.statements:
+            if datatype is None:
+                term = self.term(obj)
+            elif datatype == QUANTITY_VALUE:
+                # Blank node labels only need to be unique within the file
+                term = "_:" + self.subject + "_q" + str(len(lines))
+                lines.append(term + " " + self.term("qudt:numericValue") + " \"" + escapeLiteral(obj[0])
+                             + "\"^^<" + Namespace.XSD + "double>" + self.context + " .\n")
+                lines.append(term + " " + self.term("qudt:unit") + " " + self.term("unit:" + obj[1])
+                             + self.context + " .\n")
+            else:
+                term = "\"" + escapeLiteral(obj) + "\"^^<" + Namespace.XSD + datatype + ">"
+            lines.append(subject + self.term(predicate) + " " + term + self.context + " .\n")
+        self.sink.write("".join(lines) + "\n")
+        self.subject = None
+        self.statements = []
+
+class GraphEmitter(TurtleEmitter):
+    """Adds the statements of TurtleEmitter to an rdflib Graph instead of a file.
+
+    Literals get the lexical form the Turtle output would have, so the graph
+    is identical to the one a consumer parses from that output.
+    """
+
+    def __init__(self, graph):
+        super().__init__(None)
+        self.graph = graph
+        self.prefixes = rdfPrefixes()
+        self.terms = {"a": URIRef(Namespace.RDF + "type")}
+        self.datatypes = {}
+
+    def header(self):
+        self.graph.add((URIRef(state.baseURI), self.term("rdf:type"), URIRef(Namespace.OWL + "Ontology")))
+
+    def term(self, name):
+        """Expand a prefixed name (e.g. bot:Element) to a URIRef, memoized"""
+        iri = self.terms.get(name)
+        if iri is None:
+            prefix, local = name.split(":", 1)
+            iri = self.terms[name] = URIRef(self.prefixes[prefix] + local)
+        return iri
+
+    def end(self):
+        subject = URIRef(state.baseURI + self.subject)
+        add = self.graph.add
+        for predicate, obj, datatype in self.statements:
+            if datatype is None:
+                term = self.term(obj)
+            elif datatype == QUANTITY_VALUE:
+                term = BNode()
+                add((term, self.term("qudt:numericValue"),
+                     Literal(str(obj[0]), datatype=URIRef(Namespace.XSD + "double"))))
+                add((term, self.term("qudt:unit"), self.term("unit:" + obj[1])))
+            else:
+                if datatype not in self.datatypes:
+                    self.datatypes[datatype] = URIRef(Namespace.XSD + datatype)
+                lexical = str(obj).replace('\n', ', ').replace('\r', '')
+                term = Literal(lexical, datatype=self.datatypes[datatype])
+            add((subject, self.term(predicate), term))
+        self.subject = None
+        self.statements = []
+
+def createEmitter(sink):
+    """Emitter for the current output_format"""
+    if state.output_format == 'nt':
+        return NTriplesEmitter(sink)
+    if state.output_format == 'nq':
+        return NTriplesEmitter(sink, state.baseURI)
+    return TurtleEmitter(sink)
+
+class ConversionPipeline:
+    """Producer/consumer conversion linked by bounded queues.
+
+    The thread that uses the pipeline is the producer: it walks the
+    entities and runs the writers (which read the psets) on emitter, which
+    only records the statements of each block. A serializer thread formats
+    the blocks for the current output_format, a writer thread flushes the
+    text to file and a third thread appends the Excel rows sent to rows to
+    row_sink, so traversal, formatting and both sinks overlap. Items move
+    in batches of PIPELINE_BATCH and a full queue blocks the stage before
+    it, which bounds the memory in flight. Leaving the with-block waits for
+    all stages and re-raises the first error of any stage.
+    """
+
+    def __init__(self, file, row_sink):
+        self.file = file
+        self.row_sink = row_sink
+        self.blocks = queue.Queue(PIPELINE_QUEUE_SIZE)
+        self.chunks = queue.Queue(PIPELINE_QUEUE_SIZE)
+        self.row_batches = queue.Queue(PIPELINE_QUEUE_SIZE)
+        self.errors = []
+        # The stage threads format with the producer's baseURI and output_format
+        self.state = state.snapshot()
+        self.emitter = BatchEmitter(self.blocks)
+        self.rows = BatchRows(self.row_batches)
+        self.threads = [
+            threading.Thread(target=self.stage, args=(self.serialize, self.blocks, self.chunks), daemon=True),
+            threading.Thread(target=self.stage, args=(self.file.write, self.chunks), daemon=True),
+            threading.Thread(target=self.stage, args=(self.row_sink.extend, self.row_batches), daemon=True),
+        ]
+
+    def __enter__(self):
+        for thread in self.threads:
+            thread.start()
+        # Queued before any block can reach the writer
+        header = io.StringIO()
+        createEmitter(header).header()
+        self.chunks.put(header.getvalue())
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.emitter.flush()
+        self.rows.flush()
+        # None tells a stage that its input is finished
+        self.blocks.put(None)
+        self.row_batches.put(None)
+        for thread in self.threads:
+            thread.join()
+        if exc_type is None and self.errors:
+            raise self.errors[0]
+
+    def stage(self, handle, inbox, outbox=None):
+        state.restore(self.state)
+        failed = False
+        while True:
+            item = inbox.get()
+            if item is None:
+                break
+            # After an error the stage keeps draining, so the stages before it never block
+            if not failed:
+                try:
+                    handle(item)
+                except Exception as e:
+                    self.errors.append(e)
+                    failed = True
+        if outbox is not None:
+            outbox.put(None)
+
+    def serialize(self, batch):
+        text = io.StringIO()
+        emitter = createEmitter(text)
+        for emitter.subject, emitter.statements in batch:
+            emitter.end()
+        self.chunks.put(text.getvalue())
+
+class BatchEmitter(TurtleEmitter):
+    """Emitter of ConversionPipeline: collects (subject, statements) blocks
+    and puts them on a queue in batches instead of formatting them"""
+
+    def __init__(self, blocks):
+        super().__init__(None)
+        self.queue = blocks
+        self.batch = []
+
+    def end(self):
+        self.batch.append((self.subject, self.statements))
+        self.subject = None
+        self.statements = []
+        if len(self.batch) >= PIPELINE_BATCH:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.queue.put(self.batch)
+            self.batch = []
+
+class BatchRows:
+    """Row sink of ConversionPipeline: puts the Excel rows on a queue in batches"""
+
+    def __init__(self, row_batches):
+        self.queue = row_batches
+        self.batch = []
+        self.rows = 0
+
+    def append(self, data_row):
+        self.batch.append(data_row)
+        self.rows += 1
+        if len(self.batch) >= PIPELINE_BATCH:
+            self.flush()
+
+    def extend(self, data_rows):
+        for data_row in data_rows:
+            self.append(data_row)
+
+    def __len__(self):
+        return self.rows
+
+    def flush(self):
+        if self.batch:
+            self.queue.put(self.batch)
+            self.batch = []
+
+def formatTurtleBlock(subject, statements):
+    lines = []
+    previous = None
+    for predicate, obj, datatype in statements:
+        if datatype is None:
+            term = obj
+        elif datatype == QUANTITY_VALUE:
+            term = "[ qudt:numericValue \"" + escapeLiteral(obj[0]) + "\"^^xsd:double ; qudt:unit unit:" + obj[1] + " ]"
+        else:
+            term = "\"" + escapeLiteral(obj) + "\"^^xsd:" + datatype
+        # Repeated predicates are written as an object list
+        if predicate == previous:
+            lines[-1] += " , " + term
+        else:
+            lines.append("\t" + predicate + " " + term)
+        previous = predicate
+    return "inst:" + subject + "\n" + " ;\n".join(lines) + " . \n\n"
+
+def escapeLiteral(value):
+    """Escape a value for use inside a double-quoted literal"""
+    return str(value).replace('\\', '\\\\').replace('\n', ', ').replace('\r', '').replace('"', '\\"')
+
+def print_properties(properties, emitter, element_id="", element_type="", element_name=""):    
+    for raw_name, value in properties.items():   
+        if raw_name == "id":
             continue     
-        name = cleanString(name)
-        output += ";\n"
+        name, name_unit = state.property_schema.lookup(raw_name)
         
         # Determine data type and unit
-        data_type = ""
-        unit = ""
-        
-        if isinstance(value, bool):
-            output += "\tprops:"+name+" \""+ str(value) +"\"^^xsd:boolean "
-            data_type = "boolean"
-        elif isinstance(value, int):          
-            output += "\tprops:"+name+" \""+ str(value) +"\"^^xsd:int "
-            data_type = "integer"
-            unit = extract_unit_from_name(name)
-        elif isinstance(value, float):    
-            output += "\tprops:"+name+" \""+ str(value) +"\"^^xsd:double "
-            data_type = "double"
-            unit = extract_unit_from_name(name)
-        else:
-            # Escape newlines and quotes in strings
-            value_str = str(value).replace('\n', ', ').replace('\r', '').replace('"', '\\"')
-            output += "\tprops:"+name+" \""+ value_str +"\"^^xsd:string "
-            data_type = "string"
+        xsd_datatype, data_type = valueDatatype(value)
+        unit = name_unit if data_type in ("integer", "double") else ""
+        emitter.literal("props:"+name, value, xsd_datatype)
         
         # Add to Excel data
-        excel_data.append({
+        state.excel_data.append({
             'Element_ID': element_id,
             'Element_Type': element_type,
             'Element_Name': element_name,
@@ -194,21 +1982,52 @@ def print_properties(properties, output, element_id="", element_type="", element
             'Data_Type': data_type,
             'Unit': unit
         })
-    return output
 
-""" def print_quantities(quantities, output):    
-    for name, value in quantities.items():   
-        if name == "id":
-            continue     
-        name = cleanString(name)
-        output += ";\n"
-        if isinstance(value, int):          
-            output += "\tprops:"+name+" \""+ str(value) +"\"^^xsd:int "
-        elif isinstance(value, float):    
-            output += "\tprops:"+name+" \""+ str(value) +"\"^^xsd:double "
-        else:           
-            output += "\tprops:"+name+" \""+ str(value) +"\"^^xsd:string "
-    return output """
+# Unit symbol (ifcopenshell.util.unit) -> (QUDT unit, unit shown in the Excel file)
+QUANTITY_UNITS = {
+    'mm': ("MilliM", "mm"),
+    'cm': ("CentiM", "cm"),
+    'm': ("M", "m"),
+    'km': ("KiloM", "km"),
+    'mm2': ("MilliM2", "mm²"),
+    'cm2': ("CentiM2", "cm²"),
+    'm2': ("M2", "m²"),
+    'mm3': ("MilliM3", "mm³"),
+    'cm3': ("CentiM3", "cm³"),
+    'm3': ("M3", "m³"),
+    'g': ("GM", "g"),
+    'kg': ("KiloGM", "kg"),
+    't': ("TONNE", "t"),
+    's': ("SEC", "s"),
+    'in': ("IN", "in"),
+    'ft': ("FT", "ft"),
+    'in2': ("IN2", "in²"),
+    'ft2': ("FT2", "ft²"),
+    'in3': ("IN3", "in³"),
+    'ft3': ("FT3", "ft³"),
+    'lb': ("LB", "lb"),
+}
+
+def print_quantities(quantities, emitter, element_id="", element_type="", element_name=""):
+    for raw_name, (value, symbol) in quantities.items():
+        if value is None:
+            continue
+        qudt_unit, unit = QUANTITY_UNITS.get(symbol, (None, symbol))
+        # The unit is kept in the property schema, from which map_to_ontology.py
+        # annotates props:<name> with qudt:unit; the value stays a typed literal
+        name = state.property_schema.lookup(raw_name, unit)[0]
+        xsd_datatype, data_type = valueDatatype(value)
+        emitter.literal("props:"+name, value, xsd_datatype)
+
+        state.excel_data.append({
+            'Element_ID': element_id,
+            'Element_Type': element_type,
+            'Element_Name': element_name,
+            'Parameter': name,
+            'Value': str(value),
+            'Data_Type': data_type,
+            'Unit': unit
+        })
 
 def cleanString(name):
     name = ''.join(x for x in name.title() if not x.isspace())
@@ -216,43 +2035,135 @@ def cleanString(name):
     name = name.replace('/', '')
     return name
 
+# Use regex patterns to match units more precisely
+# Check for specific patterns with word boundaries or underscores
+# Order matters - check more specific patterns first
+UNIT_PATTERNS = [(re.compile(pattern, re.IGNORECASE), unit) for pattern, unit in [
+    (r'_Kgco₂?Eq', 'kgCO₂eq'),
+    (r'_Kgso₂?Eq', 'kgSO₂eq'),
+    (r'_Mjkg', 'MJ/kg'),
+    (r'_Mpa', 'MPa'),
+    (r'_Eur', 'EUR'),
+    (r'_Years', 'years'),
+    (r'_Ctuh', 'CTUh'),
+    (r'_Mm(?:$|_)', 'mm'),  # Match Mm at end or before underscore
+    (r'_Cm(?:$|_)', 'cm'),
+    (r'_Km(?:$|_)', 'km'),
+    (r'_Kg(?:$|_)', 'kg'),
+    (r'_M(?:$|_)', 'm'),    # Match single M at end or before underscore
+    (r'_M2', 'm²'),
+    (r'_M3', 'm³'),
+    (r'_M²', 'm²'),
+    (r'_M³', 'm³'),
+]]
+
 def extract_unit_from_name(param_name):
     """Extract unit from parameter name if present"""
-    # Use regex patterns to match units more precisely
-    # Check for specific patterns with word boundaries or underscores
-    import re
-    
-    # Order matters - check more specific patterns first
-    unit_patterns = [
-        (r'_Kgco₂?Eq', 'kgCO₂eq'),
-        (r'_Kgso₂?Eq', 'kgSO₂eq'),
-        (r'_Mjkg', 'MJ/kg'),
-        (r'_Mpa', 'MPa'),
-        (r'_Eur', 'EUR'),
-        (r'_Years', 'years'),
-        (r'_Ctuh', 'CTUh'),
-        (r'_Mm(?:$|_)', 'mm'),  # Match Mm at end or before underscore
-        (r'_Cm(?:$|_)', 'cm'),
-        (r'_Km(?:$|_)', 'km'),
-        (r'_Kg(?:$|_)', 'kg'),
-        (r'_M(?:$|_)', 'm'),    # Match single M at end or before underscore
-        (r'_M2', 'm²'),
-        (r'_M3', 'm³'),
-        (r'_M²', 'm²'),
-        (r'_M³', 'm³'),
-    ]
-    
-    for pattern, unit in unit_patterns:
-        if re.search(pattern, param_name, re.IGNORECASE):
+    for pattern, unit in UNIT_PATTERNS:
+        if pattern.search(param_name):
             return unit
     
     return ""
 
+def valueDatatype(value):
+    """(XSD datatype, Excel Data Type) of a property value"""
+    if isinstance(value, bool):
+        return "boolean", "boolean"
+    elif isinstance(value, int):
+        return "int", "integer"
+    elif isinstance(value, float):
+        return "double", "double"
+    return "string", "string"
+
+class PropertySchema:
+    """Raw pset property name -> (clean name, unit).
+
+    A model only has a few hundred distinct property names, so cleanString
+    and the unit patterns run once per name instead of once per property
+    occurrence. The datatype is not part of the table: it is taken from
+    each value, as the same name can hold values of different types. The
+    table is saved to PROPERTY_SCHEMA_FILE and reused by later runs (and
+    by map_to_ontology.py) as long as the converter code is unchanged.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else {}
+        self.changed = False
+
+    def lookup(self, raw_name, unit=None):
+        """unit (of a quantity) replaces the unit found in the name"""
+        entry = self.entries.get(raw_name)
+        if entry is None or (unit and entry[1] != unit):
+            name = cleanString(raw_name)
+            entry = (name, unit or extract_unit_from_name(name))
+            self.entries[raw_name] = entry
+            self.changed = True
+        return entry
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r", encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if data.get('version') != converterVersion():
+            return cls()
+        return cls({raw_name: tuple(entry) for raw_name, entry in data['properties'].items()})
+
+    def save(self, path):
+        if not self.changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Replace atomically, batch jobs may save at the same time
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding='utf-8') as f:
+                json.dump({'version': converterVersion(), 'properties': self.entries}, f,
+                          ensure_ascii=False)
+            os.replace(temp_path, path)
+            self.changed = False
+        except OSError as e:
+            print(f"Could not save the property schema: {e}")
+
+# Columns of the Excel parameter table: (header, excel_data key, width)
+EXCEL_COLUMNS = [
+    ('Element ID', 'Element_ID', 15),
+    ('Element Type', 'Element_Type', 20),
+    ('Element Name', 'Element_Name', 25),
+    ('Parameter', 'Parameter', 30),
+    ('Value', 'Value', 20),
+    ('Data Type', 'Data_Type', 12),
+    ('Unit', 'Unit', 12),
+]
+
+def styleHeaderCell(cell):
+    cell.font = Font(bold=True, color="FFFFFF")
+    cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    cell.alignment = Alignment(horizontal="center", vertical="center")
+
+def formatParameterSheet(ws):
+    """Column widths, frozen header row, view and print settings"""
+    for col_num, (header, key, width) in enumerate(EXCEL_COLUMNS, 1):
+        ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = width
+    
+    # Freeze header row
+    ws.freeze_panes = 'A2'
+    
+    # Set default view to start at cell A1
+    ws.sheet_view.showGridLines = True
+    ws.sheet_view.showRowColHeaders = True
+    ws.sheet_view.tabSelected = True
+    
+    # Set print settings
+    ws.page_setup.orientation = 'landscape'
+    ws.page_setup.fitToWidth = 1
+    ws.page_setup.fitToHeight = 0
+
 def generate_excel_output(excel_file):
     """Generate Excel file with all parameters, values and units"""
-    global excel_data
     
-    if not excel_data:
+    if not state.excel_data:
         print("No data to export to Excel")
         return
     
@@ -261,64 +2172,195 @@ def generate_excel_output(excel_file):
     ws = wb.active
     ws.title = "IFC Parameters"
     
-    # Define headers
-    headers = ['Element ID', 'Element Type', 'Element Name', 'Parameter', 'Value', 'Data Type', 'Unit']
-    
-    # Style for headers
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
     # Write headers
-    for col_num, header in enumerate(headers, 1):
+    for col_num, (header, key, width) in enumerate(EXCEL_COLUMNS, 1):
         cell = ws.cell(row=1, column=col_num)
         cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
+        styleHeaderCell(cell)
     
     # Write data
-    for row_num, data_row in enumerate(excel_data, 2):
-        ws.cell(row=row_num, column=1, value=data_row['Element_ID'])
-        ws.cell(row=row_num, column=2, value=data_row['Element_Type'])
-        ws.cell(row=row_num, column=3, value=data_row['Element_Name'])
-        ws.cell(row=row_num, column=4, value=data_row['Parameter'])
-        ws.cell(row=row_num, column=5, value=data_row['Value'])
-        ws.cell(row=row_num, column=6, value=data_row['Data_Type'])
-        ws.cell(row=row_num, column=7, value=data_row['Unit'])
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 15
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 25
-    ws.column_dimensions['D'].width = 30
-    ws.column_dimensions['E'].width = 20
-    ws.column_dimensions['F'].width = 12
-    ws.column_dimensions['G'].width = 12
+    for row_num, data_row in enumerate(state.excel_data, 2):
+        for col_num, (header, key, width) in enumerate(EXCEL_COLUMNS, 1):
+            ws.cell(row=row_num, column=col_num, value=data_row[key])
     
-    # Freeze header row
-    ws.freeze_panes = 'A2'
-    
-    # Set default view to start at cell A1
-    ws.sheet_view.showGridLines = True
-    ws.sheet_view.showRowColHeaders = True
-    ws.sheet_view.tabSelected = True
-    
-    # Set print settings
-    ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
-    ws.page_setup.fitToWidth = 1
-    ws.page_setup.fitToHeight = 0
+    formatParameterSheet(ws)
     
     # Save workbook
-    wb.save(excel_file)
+    saveAtomically(excel_file, wb.save)
     print(f"Excel file generated: {excel_file}")
-    print(f"Total rows exported: {len(excel_data)}")
+    print(f"Total rows exported: {len(state.excel_data)}")
+
+class StreamingExcelWriter:
+    """Writes the Excel parameter table while the conversion runs.
+
+    Uses openpyxl's write-only mode: every appended row goes straight to
+    the worksheet's temporary XML part instead of becoming cell objects,
+    so memory use does not grow with the number of rows. Can stand in for
+    the excel_data list (append/extend/len).
+    """
+
+    def __init__(self, excel_file):
+        self.excel_file = excel_file
+        self.rows = 0
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("IFC Parameters")
+        formatParameterSheet(self.ws)
+        header_cells = []
+        for header, key, width in EXCEL_COLUMNS:
+            cell = WriteOnlyCell(self.ws, value=header)
+            styleHeaderCell(cell)
+            header_cells.append(cell)
+        self.ws.append(header_cells)
+
+    def append(self, data_row):
+        self.ws.append([data_row[key] for header, key, width in EXCEL_COLUMNS])
+        self.rows += 1
+
+    def extend(self, data_rows):
+        for data_row in data_rows:
+            self.append(data_row)
+
+    def __len__(self):
+        return self.rows
+
+    def close(self):
+        saveAtomically(self.excel_file, self.wb.save)
+        print(f"Excel file generated: {self.excel_file}")
+        print(f"Total rows exported: {self.rows}")
+
+    def discard(self):
+        """Drop the rows written so far without saving (failed or cancelled conversion)"""
+        if not self.ws.closed:
+            self.ws.close()
+            self.ws._writer.cleanup()
+
+class PropertyTable:
+    """The 7-column parameter table stored column by column.
+
+    Every column except Value is dictionary encoded: each distinct string
+    is stored once and the rows hold uint32 codes in typed arrays. This
+    is much smaller than one dict per row. It can stand in for the
+    excel_data list: append/extend take row dicts and iterating yields
+    row dicts again.
+    """
+
+    ENCODED = [key for header, key, width in EXCEL_COLUMNS if key != 'Value']
+
+    def __init__(self):
+        self.codes = {key: array('I') for key in self.ENCODED}
+        self.dictionaries = {key: [] for key in self.ENCODED}
+        self.lookup = {key: {} for key in self.ENCODED}
+        self.values = []
+
+    def append(self, data_row):
+        for key in self.ENCODED:
+            text = data_row[key]
+            code = self.lookup[key].get(text)
+            if code is None:
+                code = self.lookup[key][text] = len(self.dictionaries[key])
+                self.dictionaries[key].append(text)
+            self.codes[key].append(code)
+        self.values.append(data_row['Value'])
 
+    def extend(self, data_rows):
+        for data_row in data_rows:
+            self.append(data_row)
 
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        columns = [(key, self.codes[key], self.dictionaries[key]) for key in self.ENCODED]
+        for i, value in enumerate(self.values):
+            data_row = {key: dictionary[codes[i]] for key, codes, dictionary in columns}
+            data_row['Value'] = value
+            yield data_row
+
+    def to_arrow(self):
+        """pyarrow Table with dictionary-encoded string columns"""
+        columns = {}
+        for header, key, width in EXCEL_COLUMNS:
+            if key == 'Value':
+                columns[key] = pa.array(self.values, type=pa.string())
+            else:
+                # uint32 codes are handed to Arrow without copying the array
+                indices = pa.Array.from_buffers(pa.uint32(), len(self.values),
+                                                [None, pa.py_buffer(self.codes[key])])
+                columns[key] = pa.DictionaryArray.from_arrays(
+                    indices, pa.array(self.dictionaries[key], type=pa.string()))
+        return pa.table(columns)
+
+class RowFanout:
+    """Sends every Excel row to several row sinks"""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def append(self, data_row):
+        for sink in self.sinks:
+            sink.append(data_row)
+
+    def extend(self, data_rows):
+        for data_row in data_rows:
+            self.append(data_row)
+
+    def __len__(self):
+        return len(self.sinks[0])
+
+def resolveTableFormat(table_format):
+    """'auto' means Parquet when pyarrow is installed; without pyarrow everything becomes CSV"""
+    if table_format == 'auto':
+        return 'parquet' if pa is not None else 'csv'
+    if table_format in ('parquet', 'arrow') and pa is None:
+        print(f"pyarrow is not installed, writing the property table as CSV instead of {table_format}")
+        return 'csv'
+    return table_format
+
+def write_property_table(table, base_path, table_format='auto'):
+    """Write the property table as <base_path>.parquet, .arrow or .csv.
+
+    'auto' writes Parquet when pyarrow is installed and CSV otherwise.
+    Returns the path of the written file.
+    """
+    table_format = resolveTableFormat(table_format)
+    table_file = base_path + "." + table_format
+    if table_format not in ('parquet', 'arrow', 'csv'):
+        raise ValueError(f"Unknown property table format: {table_format}")
+
+    def save(path):
+        if table_format == 'parquet':
+            pq.write_table(table.to_arrow(), path)
+        elif table_format == 'arrow':
+            feather.write_feather(table.to_arrow(), path)
+        else:
+            with open(path, "w", encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow([key for header, key, width in EXCEL_COLUMNS])
+                for data_row in table:
+                    writer.writerow([data_row[key] for header, key, width in EXCEL_COLUMNS])
+    saveAtomically(table_file, save)
+    print(f"Property table generated: {table_file}")
+    return table_file
+
+def rdfPrefixes():
+    """Prefix -> namespace of the prefixed names used by the writers"""
+    return {
+        'inst': state.baseURI,
+        'rdf': Namespace.RDF,
+        'rdfs': Namespace.RDFS,
+        'xsd': Namespace.XSD,
+        'bot': Namespace.BOT,
+        'beo': Namespace.BEO,
+        'mep': Namespace.MEP,
+        'geom': Namespace.GEOM,
+        'props': Namespace.PROPS,
+        'qudt': Namespace.QUDT,
+        'unit': Namespace.UNIT,
+    }
 
 def writeTTLHeader():
-    s = "# baseURI: " + baseURI + "\n"
-    s+= "@prefix inst: <" + baseURI + "> .\n"
+    s = "# baseURI: " + state.baseURI + "\n"
+    s+= "@prefix inst: <" + state.baseURI + "> .\n"
     s+= "@prefix rdf:  <" + Namespace.RDF + "> .\n"
     s+= "@prefix rdfs:  <" + Namespace.RDFS + "> .\n"
     s+= "@prefix xsd:  <" + Namespace.XSD + "> .\n"
@@ -326,266 +2368,815 @@ def writeTTLHeader():
     s+= "@prefix beo:  <" + Namespace.BEO + "> .\n"
     s+= "@prefix mep:  <" + Namespace.MEP + "> .\n"
     s+= "@prefix geom:  <" + Namespace.GEOM + "> .\n"
-    s+= "@prefix props:  <" + Namespace.PROPS + "> .\n\n"
+    s+= "@prefix props:  <" + Namespace.PROPS + "> .\n"
+    s+= "@prefix qudt:  <" + Namespace.QUDT + "> .\n"
+    s+= "@prefix unit:  <" + Namespace.UNIT + "> .\n\n"
 
     s+= "inst: rdf:type <http://www.w3.org/2002/07/owl#Ontology> .\n\n"
 
     return s
 
-def writeLBDinstances(model, f):
-    global element_filters
-    output = ""
-    
-    if element_filters.get('sites', True):
-        output += writeSites(model,f)
-        print("  ✓ Processed Sites")
-    
-    if element_filters.get('buildings', True):
-        output += writeBuildings(model,f)
-        print("  ✓ Processed Buildings")
-    
-    if element_filters.get('storeys', True):
-        output += writeStoreys(model,f)
-        print("  ✓ Processed Storeys")
-    
-    if element_filters.get('spaces', True):
-        output += writeSpaces(model,f)
-        print("  ✓ Processed Spaces")
-    
-    if element_filters.get('elements', True):
-        output += writeElements(model,f)
-        print("  ✓ Processed Elements")
-    
-    if element_filters.get('interfaces', True):
-        output += writeInterfaces(model,f)
-        print("  ✓ Processed Interfaces")
-    
-    if element_filters.get('zones', True):
-        output += writeZones(model,f)
-        print("  ✓ Processed Zones")
-    
-    return output
-
-def writeSites(model,f):
-    output = ""
-    for s in model.by_type("IfcSite"):                
-        site_id = "site_"+str(s.id())
-        site_name = s.Name if s.Name else ""
-        output += "inst:" + site_id + "\n"
-        output += "\ta bot:Site ;" + "\n"
-        if(s.Name):
-            output += "\trdfs:label \""+s.Name+"\"^^xsd:string ;" + "\n"
-        if(s.Description):
-            output += "\trdfs:comment \""+s.Description+"\"^^xsd:string ;" + "\n"        
-        output += "\tbot:hasGuid \""+ ios.guid.expand(s.GlobalId) +"\"^^xsd:string ;" + "\n" # bot:hasGuid no such property in the bot ontology？
-        output += "\tprops:hasCompressedGuid \""+ s.GlobalId +"\"^^xsd:string "
-        for reldec in s.IsDecomposedBy:
-            if reldec is not None:
-                for b in reldec.RelatedObjects:
-                    output += ";\n"
-                    output += "\tbot:hasBuilding inst:building_"+ str(b.id()) + " "
-        if(includeBuildingProperties):
-            site_psets = get_psets(s)
-            for name, properties in site_psets.items():
-                output = print_properties(properties, output, site_id, "Site", site_name)                             
-                
-        output += ". \n\n"
-    return output
-
-def writeBuildings(model,f):
-    output = ""
-    for b in model.by_type("IfcBuilding"):                
-        building_id = "building_"+str(b.id())
-        building_name = b.Name if b.Name else ""
-        output += "inst:" + building_id + "\n"
-        output += "\ta bot:Building ;" + "\n"
-        if(b.Name):
-            output += "\trdfs:label \""+b.Name+"\"^^xsd:string ;" + "\n"
-        if(b.Description):
-            output += "\trdfs:comment \""+b.Description+"\"^^xsd:string ;" + "\n"        
-        output += "\tbot:hasGuid \""+ ios.guid.expand(b.GlobalId) +"\"^^xsd:string ;" + "\n"
-        output += "\tprops:hasCompressedGuid \""+ b.GlobalId +"\"^^xsd:string "
-        for reldec in b.IsDecomposedBy:
-            if reldec is not None:
-                for st in reldec.RelatedObjects:
-                    output += ";\n"
-                    output += "\tbot:hasStorey inst:storey_"+ str(st.id()) + " "
-        if(includeBuildingProperties):
-            psets = get_psets(b)
-            for name, properties in psets.items():
-                output = print_properties(properties, output, building_id, "Building", building_name)                             
-                
-        output += ". \n\n"
-    return output
-
-def writeStoreys(model,f):
-    output = ""
-    for b in model.by_type("IfcBuildingStorey"):                
-        storey_id = "storey_"+str(b.id())
-        storey_name = b.Name if b.Name else ""
-        output += "inst:" + storey_id + "\n"
-        output += "\ta bot:Storey ;" + "\n"
-        if(b.Name):
-            output += "\trdfs:label \""+b.Name+"\"^^xsd:string ;" + "\n"
-        if(b.Description):
-            output += "\trdfs:comment \""+b.Description+"\"^^xsd:string ;" + "\n"        
-        output += "\tbot:hasGuid \""+ ios.guid.expand(b.GlobalId) +"\"^^xsd:string ;" + "\n"
-        output += "\tprops:hasCompressedGuid \""+ b.GlobalId +"\"^^xsd:string "
-        for reldec in b.IsDecomposedBy:
-            if reldec is not None:
-                for st in reldec.RelatedObjects:
-                    output += ";\n"
-                    output += "\tbot:hasSpace inst:space_"+ str(st.id()) + " "
-        for relcontains in b.ContainsElements:
-            if relcontains is not None:
-                for st in relcontains.RelatedElements:
-                    output += ";\n"
-                    output += "\tbot:containsElement inst:element_"+ str(st.id()) + " "
-
-        if(includeBuildingProperties):
-            psets = get_psets(b)
-            for name, properties in psets.items():
-                output = print_properties(properties, output, storey_id, "Storey", storey_name)                             
-                
-        output += ". \n\n"
-    return output
-
-def writeSpaces(model,f):
-    output = ""
-    for b in model.by_type("IfcSpace"):                
-        space_id = "space_"+str(b.id())
-        space_name = b.Name if b.Name else ""
-        output += "inst:" + space_id + "\n"
-        output += "\ta bot:Space ;" + "\n"
-        if(b.Name):
-            output += "\trdfs:label \""+b.Name+"\"^^xsd:string ;" + "\n"
-        if(b.Description):
-            output += "\trdfs:comment \""+b.Description+"\"^^xsd:string ;" + "\n"        
-        output += "\tbot:hasGuid \""+ ios.guid.expand(b.GlobalId) +"\"^^xsd:string ;" + "\n"
-        output += "\tprops:hasCompressedGuid \""+ b.GlobalId +"\"^^xsd:string "
-        for relbounded in b.BoundedBy:
-            if relbounded is not None:
-                st = relbounded.RelatedBuildingElement
-                output += ";\n"
-                output += "\tbot:adjacentElement inst:element_"+ str(st.id()) + " "
-        for relcontains in b.ContainsElements:
-            if relcontains is not None:
-                counter = 0
-                for st in relcontains.RelatedElements:
-                    if counter == 0:
-                        output += ";\n"
-                        output += "\tbot:containsElement inst:element_"+ str(st.id()) + " "
-                        counter+=1
-                    else:
-                        output += ", inst:element_"+ str(st.id()) + " "
-                        counter+=1
-
-        if(includeBuildingProperties):
-            psets = get_psets(b)
-            for name, properties in psets.items():
-                output = print_properties(properties, output, space_id, "Space", space_name)    
-
-        #if(includeQuantities):
-        #    qsets = ios.util.element.get_qsets(b)
-        #    for name, quantities in qsets.items():
-        #        output = print_quantities(quantities, output)                          
-                
-        output += ". \n\n"
-    return output
-
-def writeZones(model,f):
-    output = ""
-    for z in model.by_type("ifcZone"):
-        zone_id = "zone_" + str(z.id())
-        zone_name = z.Name if z.Name else ""
-        output += "inst:" + zone_id + "\n"
-        output += "\ta bot:Zone ;" + "\n"
-        if(z.Name):
-            output += "\trdfs:label \""+z.Name+"\"^^xsd:string ;" + "\n"
-        if(z.Description):
-            output += "\trdfs:comment \""+z.Description+"\"^^xsd:string ;" + "\n"        
-        output += "\tprops:hasGuid \""+ ios.guid.expand(z.GlobalId) +"\"^^xsd:string ;" + "\n"
-        output += "\tprops:hasCompressedGuid \""+ z.GlobalId +"\"^^xsd:string "
-        for reldec in z.IsDecomposedBy:
-            if reldec is not None:
-                for sp in reldec.RelatedObjects:
-                    output += ";\n"
-                    output += "\tbot:hasSpace inst:space_"+ str(sp.id()) + " "
-        if(includeBuildingProperties):
-            psets = get_psets(z)
-            for name, properties in psets.items():
-                output = print_properties(properties, output, zone_id, "Zone", zone_name)                             
-                
-        output += ". \n\n"
-    return output 
-
-def writeElements(model,f):
-    output = ""
-    for b in model.by_type("IfcElement"):                
-        element_id = "element_"+str(b.id())
-        element_name = b.Name if b.Name else ""
-        element_type = b.is_a()
-        output += "inst:" + element_id + "\n"
-        output += "\ta bot:Element ;" + "\n"
-        if(b.Name):
-            output += "\trdfs:label \""+b.Name+"\"^^xsd:string ;" + "\n"
-        if(b.Description):
-            output += "\trdfs:comment \""+b.Description+"\"^^xsd:string ;" + "\n"        
-        output += "\tbot:hasGuid \""+ ios.guid.expand(b.GlobalId) +"\"^^xsd:string ;" + "\n"
-        output += "\tprops:hasCompressedGuid \""+ b.GlobalId +"\"^^xsd:string "
-
-        for relvoids in b.HasOpenings:
-            if relvoids is not None:
-                st = relvoids.RelatedOpeningElement
-                for relfills in st.HasFillings:
-                    if relfills is not None:
-                        filler = relfills.RelatedBuildingElement
-                        output += ";\n"
-                        output += "\tbot:hostsElement inst:element_"+ str(filler.id()) + " "
-
-        for relvoids in b.HasOpenings:
-            if relvoids is not None:
-                st = relvoids.RelatedOpeningElement
-                for relfills in st.HasFillings:
-                    if relfills is not None:
-                        filler = relfills.RelatedBuildingElement
-                        output += ";\n"
-                        output += "\tbot:hostsElement inst:element_"+ str(filler.id()) + " "
-
-        if(includeBuildingProperties):
-            psets = get_psets(b)
-            for name, properties in psets.items():
-                output = print_properties(properties, output, element_id, element_type, element_name)                             
-                
-        output += ". \n\n"
-    return output
-
-def writeInterfaces(model,f):
-    output = ""
-    for b in model.by_type("IfcRelSpaceBoundary"):                
-        output += "inst:interface_"+str(b.id()) + "\n"
-        output += "\ta bot:Interface ;" + "\n"
-        if(b.Name):
-            output += "\trdfs:label \""+b.Name+"\"^^xsd:string ;" + "\n"
-        if(b.Description):
-            output += "\trdfs:comment \""+b.Description+"\"^^xsd:string ;" + "\n"        
-        output += "\tbot:hasGuid \""+ ios.guid.expand(b.GlobalId) +"\"^^xsd:string ;" + "\n"
-        output += "\tprops:hasCompressedGuid \""+ b.GlobalId +"\"^^xsd:string "
-
-        sp = b.RelatingSpace
-        el = b.RelatedBuildingElement
-        if sp is not None:
-            output += ";\n"
-            output += "\tbot:interfaceOf inst:space_"+ str(sp.id()) + " "
-        if el is not None:
-            output += ";\n"
-            output += "\tbot:interfaceOf inst:element_"+ str(el.id()) + " "                
-                
-        output += ". \n\n"
-    return output
+def writeLBDinstances(model, emitter):
+    for key, writer, label, entities in plannedCategories(model):
+        for entity in entities:
+            writer(entity, emitter)
+            reportProgress()
+        print(f"  ✓ Processed {label}")
+
+def plannedCategories(model):
+    """(key, writer, label, entities) of the enabled categories; reports the entity total"""
+    planned = [(key, writer, label, selectEntities(model, key, ifc_class))
+               for key, ifc_class, writer, label in LBD_CATEGORIES if categoryEnabled(key)]
+    reportPhase("Converting entities", sum(len(entities) for key, writer, label, entities in planned))
+    return planned
+
+def reportPhase(text, total=None):
+    if state.progress is not None:
+        state.progress.phase(text, total)
+
+def reportProgress(count=1):
+    # The reporter raises when the user cancelled
+    if state.progress is not None:
+        state.progress.advance(count)
+
+def writeSite(s, emitter):
+    site_id = "site_"+str(s.id())
+    site_name = s.Name if s.Name else ""
+    emitter.start(site_id, "bot:Site")
+    if(s.Name):
+        emitter.literal("rdfs:label", s.Name, "string")
+    if(s.Description):
+        emitter.literal("rdfs:comment", s.Description, "string")
+    emitter.literal("bot:hasGuid", ios.guid.expand(s.GlobalId), "string") # bot:hasGuid no such property in the bot ontology？
+    emitter.literal("props:hasCompressedGuid", s.GlobalId, "string")
+    for child in state.relationship_index.decomposes.get(s.id(), ()):
+        emitter.iri("bot:hasBuilding", "inst:building_"+ str(child))
+    if(state.includeBuildingProperties):
+        site_psets = state.pset_index.get(s)
+        for name, properties in site_psets.items():
+            print_properties(properties, emitter, site_id, "Site", site_name)                             
+
+    if(state.includeQuantities):
+        for name, quantities in state.pset_index.get(s, quantities=True).items():
+            print_quantities(quantities, emitter, site_id, "Site", site_name)
+            
+    emitter.end()
+
+def writeBuilding(b, emitter):
+    building_id = "building_"+str(b.id())
+    building_name = b.Name if b.Name else ""
+    emitter.start(building_id, "bot:Building")
+    if(b.Name):
+        emitter.literal("rdfs:label", b.Name, "string")
+    if(b.Description):
+        emitter.literal("rdfs:comment", b.Description, "string")
+    emitter.literal("bot:hasGuid", ios.guid.expand(b.GlobalId), "string")
+    emitter.literal("props:hasCompressedGuid", b.GlobalId, "string")
+    for child in state.relationship_index.decomposes.get(b.id(), ()):
+        emitter.iri("bot:hasStorey", "inst:storey_"+ str(child))
+    if(state.includeBuildingProperties):
+        psets = state.pset_index.get(b)
+        for name, properties in psets.items():
+            print_properties(properties, emitter, building_id, "Building", building_name)                             
+
+    if(state.includeQuantities):
+        for name, quantities in state.pset_index.get(b, quantities=True).items():
+            print_quantities(quantities, emitter, building_id, "Building", building_name)
+            
+    emitter.end()
+
+def writeStorey(b, emitter):
+    storey_id = "storey_"+str(b.id())
+    storey_name = b.Name if b.Name else ""
+    emitter.start(storey_id, "bot:Storey")
+    if(b.Name):
+        emitter.literal("rdfs:label", b.Name, "string")
+    if(b.Description):
+        emitter.literal("rdfs:comment", b.Description, "string")
+    emitter.literal("bot:hasGuid", ios.guid.expand(b.GlobalId), "string")
+    emitter.literal("props:hasCompressedGuid", b.GlobalId, "string")
+    for child in state.relationship_index.decomposes.get(b.id(), ()):
+        emitter.iri("bot:hasSpace", "inst:space_"+ str(child))
+    for child in state.relationship_index.contains.get(b.id(), ()):
+        emitter.iri("bot:containsElement", "inst:element_"+ str(child))
+
+    if(state.includeBuildingProperties):
+        psets = state.pset_index.get(b)
+        for name, properties in psets.items():
+            print_properties(properties, emitter, storey_id, "Storey", storey_name)                             
+
+    if(state.includeQuantities):
+        for name, quantities in state.pset_index.get(b, quantities=True).items():
+            print_quantities(quantities, emitter, storey_id, "Storey", storey_name)
+            
+    emitter.end()
+
+def writeSpace(b, emitter):
+    space_id = "space_"+str(b.id())
+    space_name = b.Name if b.Name else ""
+    emitter.start(space_id, "bot:Space")
+    if(b.Name):
+        emitter.literal("rdfs:label", b.Name, "string")
+    if(b.Description):
+        emitter.literal("rdfs:comment", b.Description, "string")
+    emitter.literal("bot:hasGuid", ios.guid.expand(b.GlobalId), "string")
+    emitter.literal("props:hasCompressedGuid", b.GlobalId, "string")
+    for child in state.relationship_index.bounds.get(b.id(), ()):
+        emitter.iri("bot:adjacentElement", "inst:element_"+ str(child))
+    for child in state.relationship_index.contains.get(b.id(), ()):
+        emitter.iri("bot:containsElement", "inst:element_"+ str(child))
+
+    if(state.includeBuildingProperties):
+        psets = state.pset_index.get(b)
+        for name, properties in psets.items():
+            print_properties(properties, emitter, space_id, "Space", space_name)    
+
+    if(state.includeQuantities):
+        for name, quantities in state.pset_index.get(b, quantities=True).items():
+            print_quantities(quantities, emitter, space_id, "Space", space_name)
+            
+    emitter.end()
+
+def writeZone(z, emitter):
+    zone_id = "zone_" + str(z.id())
+    zone_name = z.Name if z.Name else ""
+    emitter.start(zone_id, "bot:Zone")
+    if(z.Name):
+        emitter.literal("rdfs:label", z.Name, "string")
+    if(z.Description):
+        emitter.literal("rdfs:comment", z.Description, "string")
+    emitter.literal("props:hasGuid", ios.guid.expand(z.GlobalId), "string")
+    emitter.literal("props:hasCompressedGuid", z.GlobalId, "string")
+    for child in state.relationship_index.decomposes.get(z.id(), ()):
+        emitter.iri("bot:hasSpace", "inst:space_"+ str(child))
+    if(state.includeBuildingProperties):
+        psets = state.pset_index.get(z)
+        for name, properties in psets.items():
+            print_properties(properties, emitter, zone_id, "Zone", zone_name)                             
+
+    if(state.includeQuantities):
+        for name, quantities in state.pset_index.get(z, quantities=True).items():
+            print_quantities(quantities, emitter, zone_id, "Zone", zone_name)
+            
+    emitter.end()
+
+def writeElement(b, emitter):
+    element_id = "element_"+str(b.id())
+    element_name = b.Name if b.Name else ""
+    element_type = b.is_a()
+    emitter.start(element_id, "bot:Element")
+    if(state.includeClassification):
+        element_class = state.element_classes.get(element_type)
+        if element_class is not None:
+            emitter.iri("a", element_class)
+    if(b.Name):
+        emitter.literal("rdfs:label", b.Name, "string")
+    if(b.Description):
+        emitter.literal("rdfs:comment", b.Description, "string")
+    emitter.literal("bot:hasGuid", ios.guid.expand(b.GlobalId), "string")
+    emitter.literal("props:hasCompressedGuid", b.GlobalId, "string")
+
+    for child in state.relationship_index.hosts.get(b.id(), ()):
+        emitter.iri("bot:hostsElement", "inst:element_"+ str(child))
+
+    # With deduplicateTypes the type psets are on the type node, the instance keeps its own
+    type_id = state.pset_index.types.get(b.id())
+    inherit = not (state.deduplicateTypes and type_id is not None)
+    if not inherit:
+        emitter.iri("props:hasElementType", "inst:type_" + str(type_id))
+
+    if(state.includeMaterials):
+        material_id = state.material_index.get(b) if inherit else state.material_index.associations.get(b.id())
+        if material_id is not None:
+            emitter.iri("props:hasMaterial", "inst:material_" + str(material_id))
+
+    if(state.includeBuildingProperties):
+        psets = state.pset_index.get(b, inherit=inherit)
+        for name, properties in psets.items():
+            print_properties(properties, emitter, element_id, element_type, element_name)                             
+
+    if(state.includeQuantities):
+        for name, quantities in state.pset_index.get(b, quantities=True, inherit=inherit).items():
+            print_quantities(quantities, emitter, element_id, element_type, element_name)
+
+    if(state.includeGeometry):
+        writeGeometry(b, emitter)
+            
+    emitter.end()
+
+def writeGeometry(b, emitter):
+    shape = state.geometry_index.get(b)
+    if shape is None:
+        return
+    min_x, min_y, min_z, max_x, max_y, max_z, volume, area = shape
+    emitter.literal("geom:boundingBox", f"BOX3D({min_x} {min_y} {min_z}, {max_x} {max_y} {max_z})", "string")
+    emitter.quantity("geom:volume", volume, "M3")
+    emitter.quantity("geom:surfaceArea", area, "M2")
+
+def writeType(t, emitter):
+    type_id = "type_"+str(t.id())
+    type_name = t.Name if t.Name else ""
+    type_class = t.is_a()
+    emitter.start(type_id, "props:ElementType")
+    if(t.Name):
+        emitter.literal("rdfs:label", t.Name, "string")
+    if(t.Description):
+        emitter.literal("rdfs:comment", t.Description, "string")
+    emitter.literal("bot:hasGuid", ios.guid.expand(t.GlobalId), "string")
+    emitter.literal("props:hasCompressedGuid", t.GlobalId, "string")
+
+    if(state.includeMaterials):
+        material_id = state.material_index.associations.get(t.id())
+        if material_id is not None:
+            emitter.iri("props:hasMaterial", "inst:material_" + str(material_id))
+
+    if(state.includeBuildingProperties):
+        for name, properties in state.pset_index.getType(t).items():
+            print_properties(properties, emitter, type_id, type_class, type_name)
+
+    if(state.includeQuantities):
+        for name, quantities in state.pset_index.getType(t, quantities=True).items():
+            print_quantities(quantities, emitter, type_id, type_class, type_name)
+
+    emitter.end()
+
+def writeMaterial(m, emitter):
+    material_id = "material_"+str(m.id())
+    material_class = m.is_a()
+    # IfcMaterialLayerSet names itself LayerSetName, IfcMaterialList has no name
+    material_name = getattr(m, 'Name', None) or getattr(m, 'LayerSetName', None) or ""
+    emitter.start(material_id, "props:" + material_class[3:])
+    if(material_name):
+        emitter.literal("rdfs:label", material_name, "string")
+    if(getattr(m, 'Description', None)):
+        emitter.literal("rdfs:comment", m.Description, "string")
+    if(getattr(m, 'Category', None)):
+        emitter.literal("props:category", m.Category, "string")
+
+    if m.is_a("IfcMaterialLayerSet"):
+        for layer in m.MaterialLayers:
+            emitter.iri("props:hasLayer", "inst:material_" + str(layer.id()))
+    elif m.is_a("IfcMaterialConstituentSet"):
+        for constituent in m.MaterialConstituents or ():
+            emitter.iri("props:hasConstituent", "inst:material_" + str(constituent.id()))
+    elif m.is_a("IfcMaterialProfileSet"):
+        for profile in m.MaterialProfiles:
+            emitter.iri("props:hasProfile", "inst:material_" + str(profile.id()))
+    elif not m.is_a("IfcMaterial"):
+        for child in materialChildren(m):
+            emitter.iri("props:hasMaterial", "inst:material_" + str(child.id()))
+
+    if m.is_a("IfcMaterialLayer"):
+        length_unit = state.pset_index.units.get('LENGTHUNIT')
+        symbol = ifcopenshell.util.unit.get_unit_symbol(length_unit) if length_unit is not None else ""
+        qudt_unit, unit = QUANTITY_UNITS.get(symbol, (None, symbol))
+        if qudt_unit:
+            emitter.quantity("props:layerThickness", m.LayerThickness, qudt_unit)
+        else:
+            emitter.literal("props:layerThickness", m.LayerThickness, "double")
+    if m.is_a("IfcMaterialConstituent") and m.Fraction is not None:
+        emitter.literal("props:fraction", m.Fraction, "double")
+
+    if(state.includeBuildingProperties):
+        for name, properties in state.material_index.properties.get(m.id(), {}).items():
+            print_properties(properties, emitter, material_id, material_class, material_name)
+
+    emitter.end()
+
+def writeInterface(b, emitter):
+    emitter.start("interface_"+str(b.id()), "bot:Interface")
+    if(b.Name):
+        emitter.literal("rdfs:label", b.Name, "string")
+    if(b.Description):
+        emitter.literal("rdfs:comment", b.Description, "string")
+    emitter.literal("bot:hasGuid", ios.guid.expand(b.GlobalId), "string")
+    emitter.literal("props:hasCompressedGuid", b.GlobalId, "string")
+
+    sp = b.RelatingSpace
+    el = b.RelatedBuildingElement
+    if sp is not None and state.relationship_index.includes(sp):
+        emitter.iri("bot:interfaceOf", "inst:space_"+ str(sp.id()))
+    if el is not None and state.relationship_index.includes(el):
+        emitter.iri("bot:interfaceOf", "inst:element_"+ str(el.id()))
+            
+    emitter.end()
+
+# Order in which the LBD categories are written:
+# (element_filters key, IFC class, per-entity writer, progress label)
+LBD_CATEGORIES = [
+    ('sites', 'IfcSite', writeSite, 'Sites'),
+    ('buildings', 'IfcBuilding', writeBuilding, 'Buildings'),
+    ('storeys', 'IfcBuildingStorey', writeStorey, 'Storeys'),
+    ('spaces', 'IfcSpace', writeSpace, 'Spaces'),
+    ('elements', 'IfcElement', writeElement, 'Elements'),
+    ('interfaces', 'IfcRelSpaceBoundary', writeInterface, 'Interfaces'),
+    ('zones', 'IfcZone', writeZone, 'Zones'),
+    ('types', 'IfcTypeObject', writeType, 'Types'),
+    ('materials', 'IfcMaterial', writeMaterial, 'Materials'),
+]
+
+# RDF triples of an entity besides its properties (rdf:type, label, GUIDs, relations),
+# of a quantity value (blank node with type, value and unit) and of the geometry of an element
+PROFILE_BASE_TRIPLES = 5
+PROFILE_QUANTITY_TRIPLES = 4
+PROFILE_GEOMETRY_TRIPLES = 9
+# Throughput and output sizes of the cost model (see ModelProfile.estimate), measured on a
+# reference conversion; `--profile --calibrate` replaces them with the ones of this machine
+DEFAULT_CALIBRATION = {
+    'open_mb_per_second': 25.0,
+    'triples_per_second': 100000.0,
+    'rows_per_second': 6000.0,
+    'parallel_efficiency': 0.7,
+    'bytes_per_triple': {'ttl': 34.0, 'nt': 140.0, 'nq': 200.0},
+    'xlsx_bytes_per_row': 27.0,
+}
+CALIBRATION_FILE = os.path.join(DEFAULT_CACHE_DIR, "calibration.json")
+# Element classes listed by printProfile, and the worker counts it compares
+PROFILE_TOP_CLASSES = 10
+PROFILE_WORKER_COUNTS = (1, 2, 4, 8)
+
+def loadCalibration(path=CALIBRATION_FILE):
+    """DEFAULT_CALIBRATION updated with the numbers measured by calibrate(), if any"""
+    calibration = copy.deepcopy(DEFAULT_CALIBRATION)
+    try:
+        with open(path, "r", encoding='utf-8') as f:
+            measured = json.load(f)
+    except (OSError, ValueError):
+        return calibration
+    calibration['bytes_per_triple'].update(measured.pop('bytes_per_triple', {}))
+    calibration.update(measured)
+    return calibration
+
+class ModelProfile:
+    """Entity, property set and property counts of a model, for estimating a conversion.
+
+    Only the relations and the property set definitions are walked: the
+    properties are counted, never converted to values, so profiling takes a
+    fraction of the conversion time. The class filters and the pset/property
+    patterns of element_filters are applied as in a conversion, the category
+    switches only by estimate().
+
+    categories: element_filters key -> counts of the entities of that category
+    classes:    IFC class -> counts of the elements of that class
+    The counts are dicts with entities, psets, properties and quantities, the
+    own ones and those the type adds (type_psets, ...). Like in
+    PropertySetIndex, the property sets of an entity and its type are merged
+    by name, so a pset that overrides a type pset is only counted once.
+    """
+
+    COUNTS = ('entities', 'psets', 'properties', 'quantities', 'type_psets', 'type_properties',
+              'type_quantities')
+
+    def __init__(self, model, inputFile=None):
+        self.schema = model.schema
+        self.file_size = os.path.getsize(inputFile) if inputFile else 0
+        self.pset_filter = compilePatterns(state.element_filters.get('pset_patterns'))
+        self.property_filter = compilePatterns(state.element_filters.get('property_patterns'))
+        self.definitions = {}  # definition id -> (is a quantity set, pset name, property names)
+        self.occurrences = {}  # object id -> [definition id, ...]
+        self.types = {}        # object id -> type object
+        for rel in model.by_type("IfcRelDefinesByProperties"):
+            definition_ids = [self.addDefinition(d) for d in unpackDefinitions(rel.RelatingPropertyDefinition)]
+            for obj in rel.RelatedObjects:
+                self.occurrences.setdefault(obj.id(), []).extend(definition_ids)
+        for rel in model.by_type("IfcRelDefinesByType"):
+            for obj in rel.RelatedObjects:
+                self.types[obj.id()] = rel.RelatingType
+
+        self.categories = {}
+        self.classes = {}
+        for key, ifc_class, writer, label in LBD_CATEGORIES:
+            counts = self.categories[key] = dict.fromkeys(self.COUNTS, 0)
+            if key == 'materials':
+                index = MaterialIndex(model, materialScope(filteredEntities(model)))
+                counts['entities'] = len(index.nodes)
+                for psets in index.properties.values():
+                    counts['psets'] += len(psets)
+                    counts['properties'] += sum(len(p) - ('id' in p) for p in psets.values())
+                continue
+            for entity in selectEntities(model, key, ifc_class):
+                if key == 'types':
+                    own = self.countSets(self.mergeDefinitions(self.typeDefinitions(entity)))
+                    inherited = (0, 0, 0)
+                else:
+                    own, inherited = self.objectCounts(entity)
+                records = [counts]
+                if key == 'elements':
+                    records.append(self.classes.setdefault(entity.is_a(), dict.fromkeys(self.COUNTS, 0)))
+                for record in records:
+                    record['entities'] += 1
+                    for name, count in zip(self.COUNTS[1:], own + inherited):
+                        record[name] += count
+
+    def addDefinition(self, definition):
+        if definition.id() not in self.definitions:
+            quantity_set = definition.is_a("IfcElementQuantity")
+            if self.pset_filter and not self.pset_filter.match(definition.Name or ""):
+                names = frozenset()
+            elif quantity_set:
+                names = frozenset(self.quantityNames(definition.Quantities))
+            elif definition.is_a("IfcPropertySet"):
+                names = frozenset(p.Name for p in definition.HasProperties
+                                  if self.property_filter is None or self.property_filter.match(p.Name))
+            else:
+                # Predefined property sets: one property per attribute that is set
+                names = frozenset(definition.attribute_name(i) for i in range(4, len(definition))
+                                  if definition[i] is not None)
+            self.definitions[definition.id()] = (quantity_set, definition.Name, names)
+        return definition.id()
+
+    def quantityNames(self, items):
+        for quantity in items or ():
+            if quantity.is_a("IfcPhysicalComplexQuantity"):
+                yield from self.quantityNames(quantity.HasQuantities)
+            elif self.property_filter is None or self.property_filter.match(quantity.Name):
+                yield quantity.Name
+
+    def typeDefinitions(self, type_object):
+        return [self.addDefinition(d) for d in type_object.HasPropertySets or ()]
+
+    def objectCounts(self, entity):
+        """(psets, properties, quantities) of entity itself, and those its type adds"""
+        own_ids = self.occurrences.get(entity.id(), [])
+        own = self.countSets(self.mergeDefinitions(own_ids))
+        type_object = self.types.get(entity.id())
+        if type_object is None:
+            return own, (0, 0, 0)
+        # Occurrence psets override the type psets of the same name
+        merged = self.countSets(self.mergeDefinitions(self.typeDefinitions(type_object) + own_ids))
+        return own, tuple(total - count for total, count in zip(merged, own))
+
+    def mergeDefinitions(self, definition_ids):
+        """{(is a quantity set, pset name): property names}"""
+        sets = {}
+        for definition_id in definition_ids:
+            quantity_set, name, names = self.definitions[definition_id]
+            sets[(quantity_set, name)] = sets.get((quantity_set, name), frozenset()) | names
+        return sets
+
+    @staticmethod
+    def countSets(sets):
+        psets = sum(1 for names in sets.values() if names)
+        properties = sum(len(names) for (quantity_set, name), names in sets.items() if not quantity_set)
+        quantities = sum(len(names) for (quantity_set, name), names in sets.items() if quantity_set)
+        return psets, properties, quantities
+
+    def estimate(self, categories=None, workers=1, rdf_format='ttl', calibration=None):
+        """Triples, Excel rows, output sizes (bytes) and conversion time (seconds) of
+        converting the given categories (default: the enabled ones) with workers processes"""
+        if categories is None:
+            categories = [key for key, ifc_class, writer, label in LBD_CATEGORIES if categoryEnabled(key)]
+        calibration = calibration or loadCalibration()
+        entities = triples = rows = shards = 0
+        for key in categories:
+            counts = self.categories[key]
+            properties, quantities = counts['properties'], counts['quantities']
+            # Deduplicated types carry the inherited properties once, on the type nodes
+            if key not in ('types', 'materials') and not (key == 'elements' and state.deduplicateTypes):
+                properties += counts['type_properties']
+                quantities += counts['type_quantities']
+            if key == 'elements' and state.includeGeometry:
+                triples += PROFILE_GEOMETRY_TRIPLES * counts['entities']
+            if not state.includeBuildingProperties:
+                properties = 0
+            if not state.includeQuantities:
+                quantities = 0
+            entities += counts['entities']
+            triples += PROFILE_BASE_TRIPLES * counts['entities'] + properties + \
+                PROFILE_QUANTITY_TRIPLES * quantities
+            rows += properties + quantities
+            size = max(SHARD_MIN_SIZE, -(-counts['entities'] // (workers * SHARDS_PER_WORKER)))
+            shards += -(-counts['entities'] // size)
+        # Process start-up and merging keep the speed-up below the worker count
+        parallel = max(1, min(workers, shards, os.cpu_count() or 1))
+        speedup = 1 + (parallel - 1) * calibration['parallel_efficiency']
+        seconds = {
+            'open': self.file_size / 1024 ** 2 / calibration['open_mb_per_second'],
+            'convert': triples / calibration['triples_per_second'] / speedup,
+            'excel': rows / calibration['rows_per_second'],
+        }
+        return {
+            'entities': entities,
+            'triples': triples,
+            'rows': rows,
+            'rdf_bytes': triples * calibration['bytes_per_triple'].get(rdf_format, 0),
+            'xlsx_bytes': rows * calibration['xlsx_bytes_per_row'],
+            'seconds': seconds,
+            'total_seconds': sum(seconds.values()),
+        }
+
+def formatSize(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+        size /= 1024
+
+def formatDuration(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def printProfile(profile, inputFile, outputFile, workers=1, calibration=None):
+    """Print the counts and the cost estimate of converting inputFile to outputFile"""
+    rdf_format = outputFormat(outputFile)
+    calibration = calibration or loadCalibration()
+    print(f"\nProfile of {inputFile} ({profile.schema}, {formatSize(profile.file_size)})")
+    print(f"  {'':<16}{'entities':>10}{'psets':>10}{'properties':>12}{'quantities':>12}")
+    for key, ifc_class, writer, label in LBD_CATEGORIES:
+        counts = profile.categories[key]
+        marker = " " if categoryEnabled(key) else "-"
+        print(f"{marker} {label:<16}{counts['entities']:>10,}{counts['psets'] + counts['type_psets']:>10,}"
+              f"{counts['properties'] + counts['type_properties']:>12,}"
+              f"{counts['quantities'] + counts['type_quantities']:>12,}")
+    print("  Element classes by property count:")
+    ranked = sorted(profile.classes.items(),
+                    key=lambda item: -(item[1]['properties'] + item[1]['type_properties']))
+    for ifc_class, counts in ranked[:PROFILE_TOP_CLASSES]:
+        print(f"    {ifc_class:<30}{counts['entities']:>10,}{counts['psets'] + counts['type_psets']:>10,}"
+              f"{counts['properties'] + counts['type_properties']:>12,}"
+              f"{counts['quantities'] + counts['type_quantities']:>12,}")
+    if len(ranked) > PROFILE_TOP_CLASSES:
+        print(f"    ... and {len(ranked) - PROFILE_TOP_CLASSES} more classes")
+
+    estimate = profile.estimate(workers=workers, rdf_format=rdf_format, calibration=calibration)
+    excelFile = os.path.splitext(outputFile)[0] + '.xlsx'
+    seconds = estimate['seconds']
+    print(f"  Estimate: {estimate['triples']:,} triples, {estimate['rows']:,} Excel rows")
+    print(f"    {os.path.basename(outputFile)} ≈ {formatSize(estimate['rdf_bytes'])}, "
+          f"{os.path.basename(excelFile)} ≈ {formatSize(estimate['xlsx_bytes'])}")
+    print(f"    {formatDuration(estimate['total_seconds'])} with {workers} worker(s) "
+          f"(open {formatDuration(seconds['open'])}, convert {formatDuration(seconds['convert'])}, "
+          f"Excel {formatDuration(seconds['excel'])})")
+    others = [count for count in PROFILE_WORKER_COUNTS if count != workers]
+    print("    " + ", ".join(f"{count} workers: "
+                             f"{formatDuration(profile.estimate(workers=count, calibration=calibration)['total_seconds'])}"
+                             for count in others))
+    return estimate
+
+class PhaseTimer:
+    """Receives the progress reports of a conversion (see state.progress) and
+    only records how long each phase took"""
+
+    def __init__(self):
+        self.seconds = {}
+        self.current = None
+        self.started = 0.0
+
+    def phase(self, text, total=None):
+        self.stop()
+        self.current = text
+        self.started = time.monotonic()
+
+    def advance(self, count=1):
+        pass
+
+    def check(self):
+        pass
+
+    def stop(self):
+        if self.current is not None:
+            self.seconds[self.current] = self.seconds.get(self.current, 0) + time.monotonic() - self.started
+            self.current = None
+
+def calibrate(jobs, path=CALIBRATION_FILE):
+    """Convert the jobs ((ifc, output) pairs, outputs go to a temporary folder)
+    in a single process and store the measured throughput and output sizes
+    relative to the ModelProfile estimates, so later estimates match this
+    machine and this kind of model. Returns the new calibration."""
+    calibration = loadCalibration(path)
+    totals = dict.fromkeys(('mb', 'open', 'triples', 'convert', 'rows', 'excel', 'rdf_bytes',
+                            'xlsx_bytes'), 0)
+    rdf_format = outputFormat(jobs[0][1])
+    filters = state.settings()['element_filters']
+    with tempfile.TemporaryDirectory() as folder:
+        for number, (inputFile, outputFile) in enumerate(jobs):
+            started = time.monotonic()
+            model = ios.open(inputFile)
+            totals['open'] += time.monotonic() - started
+            profile = ModelProfile(model, inputFile)
+            estimate = profile.estimate(calibration=calibration)
+
+            # One target per job, so a job never measures the files of the previous one
+            target = os.path.join(folder, "calibration_%d.%s" % (number, rdf_format))
+            excelFile = os.path.splitext(target)[0] + ".xlsx"
+            timer = PhaseTimer()
+            state.progress = timer
+            try:
+                convertIFCSPFtoTTL(inputFile, target, filters=filters, model=model)
+            finally:
+                timer.stop()
+                state.progress = None
+            totals['mb'] += profile.file_size / 1024 ** 2
+            if os.path.exists(target):
+                totals['triples'] += estimate['triples']
+                totals['convert'] += timer.seconds.get("Indexing model", 0) + timer.seconds.get("Converting entities", 0)
+                totals['rdf_bytes'] += os.path.getsize(target)
+            # No Excel file is written for a model without properties
+            if os.path.exists(excelFile):
+                totals['rows'] += estimate['rows']
+                totals['excel'] += timer.seconds.get("Writing Excel file", 0)
+                totals['xlsx_bytes'] += os.path.getsize(excelFile)
+
+    # Phases too short to time keep their previous numbers
+    if totals['open'] > 0 and totals['mb'] > 0:
+        calibration['open_mb_per_second'] = totals['mb'] / totals['open']
+    if totals['convert'] > 0 and totals['triples'] > 0:
+        calibration['triples_per_second'] = totals['triples'] / totals['convert']
+        calibration['bytes_per_triple'][rdf_format] = totals['rdf_bytes'] / totals['triples']
+    if totals['excel'] > 0 and totals['rows'] > 0:
+        calibration['rows_per_second'] = totals['rows'] / totals['excel']
+        calibration['xlsx_bytes_per_row'] = totals['xlsx_bytes'] / totals['rows']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    saveJSONAtomically(path, calibration, indent=2)
+    return calibration
+
+def collectBatchJobs(inputs, manifest=None, output_dir=None, extension=".ttl"):
+    """Resolve IFC files, directories and a manifest into (ifc, output) pairs.
+
+    A manifest is a text file with one IFC path per line; blank lines and
+    lines starting with # are ignored and relative paths are resolved
+    against the manifest's folder.
+    """
+    ifc_files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            ifc_files.extend(sorted(glob.glob(os.path.join(path, "*.ifc"))))
+        else:
+            ifc_files.append(path)
+    if manifest:
+        manifest_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r", encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    ifc_files.append(os.path.join(manifest_dir, line))
+
+    jobs = []
+    # The same file listed twice would otherwise be converted twice at once
+    for ifc_file in dict.fromkeys(os.path.abspath(f) for f in ifc_files):
+        target_dir = output_dir or os.path.dirname(os.path.abspath(ifc_file))
+        name = os.path.splitext(os.path.basename(ifc_file))[0]
+        jobs.append((ifc_file, os.path.join(target_dir, name + extension)))
+    return jobs
+
+def convertBatchJob(job):
+    """Convert one batch entry; never raises so one bad file cannot stop the queue"""
+    inputFile, outputFile, filters, workers, options = job
+    started = time.time()
+    try:
+        if not os.path.isfile(inputFile):
+            raise FileNotFoundError(f"IFC file not found: {inputFile}")
+        convertIFCSPFtoTTL(inputFile, outputFile, workers=workers, filters=filters, **options)
+        return {'input': inputFile, 'output': outputFile, 'status': 'ok',
+                'error': "", 'seconds': round(time.time() - started, 2)}
+    except Exception as e:
+        return {'input': inputFile, 'output': outputFile, 'status': 'failed',
+                'error': f"{type(e).__name__}: {e}", 'seconds': round(time.time() - started, 2)}
+
+def runBatch(jobs, filters, max_jobs=1, workers=1, **options):
+    """Convert the jobs through a bounded process pool, reporting each file as it finishes.
+
+    options are passed on to convertIFCSPFtoTTL.
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=max_jobs) as pool:
+        futures = [pool.submit(convertBatchJob, (inputFile, outputFile, filters, workers, options))
+                   for inputFile, outputFile in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['status'] == 'ok':
+                print(f"[OK]     {result['input']} -> {result['output']} ({result['seconds']}s)")
+            else:
+                print(f"[FAILED] {result['input']}: {result['error']}")
+    return results
+
+def runBatchCLI(argv):
+    """Headless entry point. Exit codes: 0 all converted, 1 some failed, 2 nothing to convert"""
+    categories = [key for key, ifc_class, writer, label in LBD_CATEGORIES]
+    parser = argparse.ArgumentParser(
+        prog="IFCtoLBD.py",
+        description="Convert IFC files to LBD Turtle and Excel without the GUI.")
+    parser.add_argument("inputs", nargs="*", help="IFC files and/or folders containing .ifc files")
+    parser.add_argument("--manifest", help="text file listing one IFC path per line")
+    parser.add_argument("-o", "--output-dir", help="folder for the outputs (default: next to each IFC file)")
+    parser.add_argument("--include", nargs="+", choices=categories, metavar="CATEGORY",
+                        help="only convert these categories: " + ", ".join(categories))
+    parser.add_argument("--exclude", nargs="+", choices=categories, default=[], metavar="CATEGORY",
+                        help="skip these categories")
+    parser.add_argument("--classes", nargs="+", default=[], metavar="IFCCLASS",
+                        help="only convert elements of these IFC classes, subtypes included (e.g. IfcWall)")
+    parser.add_argument("--exclude-classes", nargs="+", default=[], metavar="IFCCLASS",
+                        help="skip elements of these IFC classes, subtypes included")
+    parser.add_argument("--psets", nargs="+", default=[], metavar="PATTERN",
+                        help="only read property/quantity sets whose name matches (e.g. 'DPP*' 'Qto_*')")
+    parser.add_argument("--properties", nargs="+", default=[], metavar="PATTERN",
+                        help="only read properties whose name matches (e.g. 'Dpp_*')")
+    parser.add_argument("--type-nodes", action="store_true",
+                        help="write the psets of each type once on a type node instead of on every instance")
+    parser.add_argument("--format", choices=['ttl', 'nt', 'nq'], default='ttl', dest="rdf_format",
+                        help="RDF output syntax: Turtle, N-Triples or N-Quads")
+    parser.add_argument("--geometry", action="store_true",
+                        help="add element bounding boxes, volumes and surface areas (tessellates the model)")
+    parser.add_argument("--guids", nargs="+", metavar="GLOBALID",
+                        help="only convert these products and their neighbourhood (single-product passport)")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="containment/hosting steps followed from the --guids products")
+    parser.add_argument("--partition", choices=['storey', 'category', 'storey+category'],
+                        help="also split the RDF output into one file per storey and/or category "
+                             "(<name>.parts/ plus a <name>.parts.json manifest)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap entity traversal, formatting and the TTL/Excel writes in threads "
+                             "(single-process conversions; implies --stream-excel)")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="commit the progress in batches of entities so an interrupted run can be resumed")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted --checkpoint run of the same file and settings")
+    parser.add_argument("--profile", action="store_true",
+                        help="only count entities and properties and estimate the output sizes and "
+                             "conversion time with the given options; nothing is converted")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="with --profile: convert the files once to measure this machine's throughput "
+                             "and use it for later estimates")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="files converted at the same time")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes per file")
+    parser.add_argument("--stream-excel", action="store_true",
+                        help="write the Excel rows while converting (constant memory on large models)")
+    parser.add_argument("--table", choices=['auto', 'parquet', 'arrow', 'csv'], dest="table_format",
+                        help="also write the property table in a columnar format "
+                             "(auto: Parquet when pyarrow is installed, else CSV)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only reconvert entities changed since the previous run and write a delta")
+    parser.add_argument("--iri-mode", choices=['timestamp', 'content', 'project'], default='timestamp',
+                        help="instance namespace: new per run (timestamp), hash of the IFC file "
+                             "(content) or hash of the IfcProject GlobalId (project)")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse outputs of identical earlier conversions (implies stable IRIs)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="conversion cache folder")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // 1024 ** 2,
+                        help="conversion cache size limit in MB")
+    parser.add_argument("--status-file", help="write the per-file status as JSON to this path")
+    args = parser.parse_args(argv)
+
+    jobs = collectBatchJobs(args.inputs, args.manifest, args.output_dir, "." + args.rdf_format)
+    if not jobs:
+        print("No IFC files to convert.")
+        return 2
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    filters = {key: (args.include is None or key in args.include) and key not in args.exclude
+               for key in categories}
+    filters.update(include_classes=args.classes, exclude_classes=args.exclude_classes,
+                   pset_patterns=args.psets, property_patterns=args.properties)
+    if args.profile:
+        return runProfileCLI(jobs, filters, args)
+    print(f"Converting {len(jobs)} IFC file(s) with {args.jobs} job(s)...")
+    results = runBatch(jobs, filters, max(1, args.jobs), max(1, args.workers),
+                       stream_excel=args.stream_excel, table_format=args.table_format,
+                       incremental=args.incremental, iri_mode=args.iri_mode,
+                       cache_dir=args.cache_dir if args.cache else None,
+                       cache_size=args.cache_size * 1024 ** 2, geometry=args.geometry,
+                       type_nodes=args.type_nodes, guids=args.guids, depth=max(0, args.depth),
+                       partition=args.partition, pipeline=args.pipeline,
+                       checkpoint=args.checkpoint, resume=args.resume)
+
+    failed = [r for r in results if r['status'] != 'ok']
+    print(f"\nBatch finished: {len(results) - len(failed)} converted, {len(failed)} failed")
+    if args.status_file:
+        with open(args.status_file, "w", encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+def runProfileCLI(jobs, filters, args):
+    """--profile: print the counts and cost estimate of every file, calibrating first with --calibrate"""
+    state.element_filters.update(filters)
+    state.includeGeometry = args.geometry
+    state.deduplicateTypes = args.type_nodes
+    calibration = None
+    if args.calibrate:
+        print(f"Calibrating on {len(jobs)} IFC file(s)...")
+        calibration = calibrate(jobs)
+        print(f"  ✓ Calibration saved to {CALIBRATION_FILE}")
+    totals = {'triples': 0, 'rows': 0, 'rdf_bytes': 0, 'xlsx_bytes': 0, 'total_seconds': 0}
+    for inputFile, outputFile in jobs:
+        profile = ModelProfile(ios.open(inputFile), inputFile)
+        estimate = printProfile(profile, inputFile, outputFile, max(1, args.workers), calibration)
+        for name in totals:
+            totals[name] += estimate[name]
+    if len(jobs) > 1:
+        # Files run side by side with --jobs
+        print(f"\nAll files: {totals['triples']:,} triples, {totals['rows']:,} Excel rows, "
+              f"{formatSize(totals['rdf_bytes'] + totals['xlsx_bytes'])}, "
+              f"about {formatDuration(totals['total_seconds'] / min(max(1, args.jobs), len(jobs)))} "
+              f"with {args.jobs} job(s)")
+    return 0
 
 #Enter the name of the ifc file behind fname between "". Enter the file name in which de document is saved in front. namefile\\
 if __name__ == '__main__':
+    # Command line arguments switch to the headless batch mode
+    if len(sys.argv) > 1:
+        sys.exit(runBatchCLI(sys.argv[1:]))
+
     # Create root window and hide it
     root = tk.Tk()
     root.withdraw()
@@ -641,8 +3232,24 @@ if __name__ == '__main__':
     print(f"  Output Excel: {ofile.replace('.ttl', '.xlsx')}")
     print(f"\nStarting conversion...")
     
+    def open_model(progress):
+        model = ios.open(fname)
+        progress.phase("Profiling model")
+        return model, ModelProfile(model, fname)
+
     try:
-        convertIFCSPFtoTTL(fname, ofile)
+        # Opening and converting run on a worker thread, so the window stays responsive
+        model, profile = run_with_progress(root, "Opening IFC model", open_model)
+        if not select_element_types(model, profile):
+            print("Element selection cancelled. Using all element types.")
+        filters = dict(state.element_filters)
+
+        def convert(progress):
+            # The worker thread has its own conversion state
+            state.progress = progress
+            convertIFCSPFtoTTL(fname, ofile, filters=filters, model=model)
+
+        run_with_progress(root, "Converting IFC to LBD", convert)
         print("\n" + "="*60)
         print("CONVERSION COMPLETE!")
         print("="*60)
@@ -652,6 +3259,9 @@ if __name__ == '__main__':
         print("="*60)
         messagebox.showinfo("Conversion Complete", 
                            f"IFC conversion successful!\n\nFiles saved:\n• {os.path.basename(ofile)}\n• {os.path.basename(ofile.replace('.ttl', '.xlsx'))}\n\nLocation:\n{output_dir}")
+    except Cancelled:
+        print("\nConversion cancelled.")
+        messagebox.showinfo("Conversion Cancelled", "The conversion was cancelled. No output files were written.")
     except Exception as e:
         print(f"\nERROR during conversion: {str(e)}")
         import traceback
@@ -7,10 +7,20 @@ import re
 import tkinter as tk
 from tkinter import filedialog, simpledialog
 import os
+from rdf_loader import load_graph
 
 
 # URI ontology
 dpp = Namespace("http://www.semanticweb.org/janneke.bosma/DPP#")   
+bmp = Namespace("https://w3id.org/bmp#")
+
+def load_data_graph(data_file):
+    # Turtle, N-Triples or N-Quads by extension. NT/NQ files carry no prefixes,
+    # so bind the ones the class check below searches for
+    data_graph = load_graph(data_file)
+    data_graph.bind("dpp", dpp)
+    data_graph.bind("bmp", bmp)
+    return data_graph
 
 # Loads shacl and ontology 
 sg = Graph().parse(r"SHACL_MultiOntology.ttl", format="turtle")
@@ -24,7 +34,7 @@ root.withdraw()  # Hide the main window
 print("Please select the TTL file(s) you want to validate...")
 selected_files = filedialog.askopenfilenames(
     title="Select TTL file(s) to validate",
-    filetypes=[("Turtle files", "*.ttl"), ("All files", "*.*")],
+    filetypes=[("RDF files", "*.ttl *.nt *.nq"), ("Turtle files", "*.ttl"), ("All files", "*.*")],
     initialdir="."
 )
 
@@ -90,7 +100,7 @@ pdf_content = []
 missing_words = {}
 
 for data_file in data_files:
-    data_graph = Graph().parse(data_file, format="turtle")
+    data_graph = load_data_graph(data_file)
     
     # Classes to check
     words_to_check = ['dpp:log', 'dpp:classificationCode', 'bmp:manufacturer', 'dpp:owner', 
@@ -113,7 +123,7 @@ if missing_words:
 
 # SHACL validation
 for data_file in data_files:
-    data_graph = Graph().parse(data_file, format="turtle")
+    data_graph = load_data_graph(data_file)
 
     r = validate(data_graph,                 
                  shacl_graph=sg,
@@ -143,7 +153,7 @@ for data_file in data_files:
                     # File found in which we search for the GUID
 
                     # Search for compressed GUID belonging to the focus node 
-                    data_graph = Graph().parse(file_name, format="turtle")
+                    data_graph = load_data_graph(file_name)
                     full_file_in_memory = data_graph.serialize(format="turtle")
 
                     # Extract data from input_string
@@ -9,4 +9,6 @@ BOT = "https://w3id.org/bot#"
 BEO = "https://pi.pauwel.be/voc/buildingelement#"
 MEP = "https://pi.pauwel.be/voc/distributionelement#"
 GEOM = "https://w3id.org/geom#"
-PROPS = "https://w3id.org/props#"
\ No newline at end of file
+PROPS = "https://w3id.org/props#"
+QUDT = "http://qudt.org/schema/qudt/"
+UNIT = "http://qudt.org/vocab/unit/"
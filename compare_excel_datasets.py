@@ -15,6 +15,15 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.units import inch
 import os
 import re
+import csv
+from progress_ui import run_with_progress, Cancelled
+
+# Optional: reading the Parquet/Arrow property table written by IFCtoLBD
+try:
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:
+    pq = None
 
 def sanitize_cell_value(value):
     """Sanitize cell value to prevent formula injection and encoding issues"""
@@ -203,22 +212,43 @@ def load_base_dataset(file_path):
     wb.close()
     return base_data
 
+def iter_converted_rows(file_path):
+    """Yield (parameter, value, unit) from the IFCtoLBD Excel file or its property table (.parquet/.arrow/.csv)"""
+    extension = os.path.splitext(file_path)[1].lower()
+    columns = ['Parameter', 'Value', 'Unit']
+    
+    if extension in ('.parquet', '.arrow', '.feather'):
+        if pq is None:
+            raise ImportError(f"pyarrow is required to read {extension} files")
+        if extension == '.parquet':
+            table = pq.read_table(file_path, columns=columns)
+        else:
+            table = feather.read_table(file_path, columns=columns)
+        yield from zip(*(table.column(name).to_pylist() for name in columns))
+    elif extension == '.csv':
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                yield row['Parameter'], row['Value'], row['Unit']
+    else:
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)  # data_only=True to get calculated values
+        ws = wb.active
+        # Read from row 2 (skip header)
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            parameter = row[3] if len(row) > 3 else None  # Column D - Parameter
+            value = row[4] if len(row) > 4 else ""  # Column E - Value
+            unit = row[6] if len(row) > 6 else ""  # Column G - Unit
+            yield parameter, value, unit
+        wb.close()
+
 def load_converted_dataset(file_path):
-    """Load converted dataset from Excel (format: Element ID | Element Type | Element Name | Parameter | Value | Data Type | Unit)"""
-    wb = openpyxl.load_workbook(file_path, data_only=True)  # data_only=True to get calculated values
-    ws = wb.active
-    
+    """Load converted dataset from Excel (format: Element ID | Element Type | Element Name | Parameter | Value | Data Type | Unit)
+    or from the columnar property table IFCtoLBD writes next to it (.parquet/.arrow/.csv)"""
     converted_data = {}
     
-    # Read from row 2 (skip header)
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        if not row[3]:  # Skip if no parameter name (column D)
+    for parameter, value, unit in iter_converted_rows(file_path):
+        if not parameter:  # Skip if no parameter name
             continue
         
-        parameter = row[3]  # Column D - Parameter
-        value = row[4] if len(row) > 4 else ""  # Column E - Value
-        unit = row[6] if len(row) > 6 else ""  # Column G - Unit
-        
         # Use normalized parameter as key
         norm_param = normalize_parameter_name(parameter)
         
@@ -230,11 +260,10 @@ def load_converted_dataset(file_path):
                 'unit': normalize_unit(unit)
             }
     
-    wb.close()
     return converted_data
 
-def compare_datasets(base_data, converted_data):
-    """Compare base and converted datasets"""
+def compare_datasets(base_data, converted_data, progress=None):
+    """Compare base and converted datasets (progress: optional progress_ui reporter)"""
     comparison_results = []
     
     matched_count = 0
@@ -279,6 +308,8 @@ def compare_datasets(base_data, converted_data):
                 result['flag'] = 'Value & Unit Mismatch'
         
         comparison_results.append(result)
+        if progress is not None:
+            progress.advance()
     
     # Calculate completeness
     completeness = (matched_count / total_count * 100) if total_count > 0 else 0
@@ -542,7 +573,7 @@ def main():
     print("\nStep 2: Select the CONVERTED dataset (IFC conversion output)")
     converted_file = filedialog.askopenfilename(
         title="Select CONVERTED Dataset Excel File",
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+        filetypes=[("Excel files", "*.xlsx"), ("Property tables", "*.parquet *.arrow *.csv"), ("All files", "*.*")],
         initialdir=os.path.dirname(base_file)
     )
     
@@ -589,30 +620,43 @@ def main():
     print("PROCESSING...")
     print("="*60)
     
-    try:
+    def run_comparison(progress):
+        """The five processing steps, run on a worker thread by run_with_progress"""
         # Load datasets
         print("\n[1/5] Loading base dataset...")
+        progress.phase("[1/5] Loading base dataset")
         base_data = load_base_dataset(base_file)
         print(f"  ✓ Loaded {len(base_data)} parameters from base dataset")
         
         print("\n[2/5] Loading converted dataset...")
+        progress.phase("[2/5] Loading converted dataset")
         converted_data = load_converted_dataset(converted_file)
         print(f"  ✓ Loaded {len(converted_data)} parameters from converted dataset")
         
         # Compare datasets
         print("\n[3/5] Comparing datasets...")
-        comparison_results, completeness, matched, total = compare_datasets(base_data, converted_data)
+        progress.phase("[3/5] Comparing datasets", total=len(base_data))
+        comparison_results, completeness, matched, total = compare_datasets(base_data, converted_data,
+                                                                            progress)
         print(f"  ✓ Comparison complete: {completeness:.1f}% match rate")
         
         # Generate Excel report
         print("\n[4/5] Generating Excel report...")
+        progress.phase("[4/5] Generating Excel report")
         generate_excel_report(comparison_results, completeness, matched, total, excel_output)
         print(f"  ✓ Excel report saved")
         
         # Generate PDF report
         print("\n[5/5] Generating PDF report...")
+        progress.phase("[5/5] Generating PDF report")
         generate_pdf_report(comparison_results, completeness, matched, total, pdf_output)
         print(f"  ✓ PDF report saved")
+        return completeness, matched, total
+    
+    try:
+        # The steps run on a worker thread, so the window stays responsive and can be cancelled
+        completeness, matched, total = run_with_progress(root, "Comparing datasets", run_comparison,
+                                                         unit="parameters")
         
         # Summary
         print("\n" + "="*60)
@@ -639,6 +683,9 @@ def main():
             f"Location:\n{output_dir}"
         )
         
+    except Cancelled:
+        print("\nComparison cancelled.")
+        messagebox.showinfo("Comparison Cancelled", "The comparison was cancelled.")
     except Exception as e:
         print(f"\nERROR during comparison: {str(e)}")
         import traceback
@@ -11,6 +11,7 @@ from dataclasses import dataclass, field
 from datetime import datetime
 import rdflib
 from rdflib import Graph, Namespace
+from rdf_loader import load_graph
 
 
 @dataclass
@@ -152,8 +153,8 @@ class TTLAnalyzer:
         self.namespaces = {}
         
         for ttl_file in ttl_files:
-            g = Graph()
-            g.parse(ttl_file, format='turtle')
+            # Turtle, N-Triples or N-Quads, by extension
+            g = load_graph(ttl_file)
             self.graphs.append(g)
             
             # Collect namespaces
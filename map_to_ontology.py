@@ -7,7 +7,9 @@ from rdflib import Graph, Namespace, Literal, URIRef, RDF, RDFS, XSD, OWL
 from rdflib.namespace import DCTERMS
 import sys
 import os
+import json
 from tkinter import Tk, filedialog
+from rdf_loader import load_graph, expand_type_properties
 
 # Define namespaces
 BOT = Namespace("https://w3id.org/bot#")
@@ -21,14 +23,103 @@ UNIT = Namespace("http://qudt.org/vocab/unit/")
 PROV = Namespace("http://www.w3.org/ns/prov#")
 FOAF = Namespace("http://xmlns.com/foaf/0.1/")
 
-def map_properties_to_ontology(input_file, output_file):
+# Property schema written by IFCtoLBD.py (same path as its PROPERTY_SCHEMA_FILE)
+PROPERTY_SCHEMA_FILE = os.path.join(os.path.expanduser("~"), ".cache", "ifctolbd", "property_schema.json")
+
+# Units detected from property names -> QUDT unit vocabulary
+QUDT_UNITS = {
+    'mm': "MilliM",
+    'cm': "CentiM",
+    'm': "M",
+    'km': "KiloM",
+    'kg': "KiloGM",
+    'm²': "M2",
+    'm³': "M3",
+    # Quantity units of IFCtoLBD.py (QUANTITY_UNITS)
+    'mm²': "MilliM2",
+    'cm²': "CentiM2",
+    'mm³': "MilliM3",
+    'cm³': "CentiM3",
+    'g': "GM",
+    't': "TONNE",
+    's': "SEC",
+    'in': "IN",
+    'ft': "FT",
+    'in²': "IN2",
+    'ft²': "FT2",
+    'in³': "IN3",
+    'ft³': "FT3",
+    'lb': "LB",
+    'MPa': "MegaPA",
+    'MJ/kg': "MegaJ-PER-KiloGM",
+    'years': "YR",
+    'EUR': "CCY_EUR",
+}
+
+# Literal datatypes that carry a unit
+NUMERIC_DATATYPES = (XSD.int, XSD.integer, XSD.double, XSD.decimal, XSD.float)
+
+def load_property_schema(schema_file=PROPERTY_SCHEMA_FILE):
+    """
+    Load the property schema of IFCtoLBD.py as clean property name -> unit.
+    Returns an empty dict when the file is missing or unreadable.
+    """
+    try:
+        with open(schema_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Older schema files also carry a datatype after the unit
+    return {entry[0]: entry[1] for entry in data.get('properties', {}).values()}
+
+def map_properties_to_ontology(input_file, output_file, schema_file=PROPERTY_SCHEMA_FILE):
     """
     Map custom props: properties to multiple standard ontology vocabularies
     Creates redundant mappings for maximum interoperability
     """
-    # Load the input TTL file
-    g = Graph()
-    g.parse(input_file, format="turtle")
+    # Load the input file (Turtle, N-Triples or N-Quads, by extension)
+    g = load_graph(input_file)
+    
+    output_g = map_graph_to_ontology(g, schema_file)
+    
+    # Write output
+    output_g.serialize(destination=output_file, format="turtle")
+    print(f"✓ Successfully mapped properties to ontology vocabularies")
+    print(f"✓ Input file: {input_file}")
+    print(f"✓ Output file: {output_file}")
+    print(f"✓ Total triples in output: {len(output_g)}")
+
+def convert_ifc_and_map(ifc_file, output_file, filters=None, iri_mode='timestamp',
+                        excel_file=None, schema_file=PROPERTY_SCHEMA_FILE):
+    """
+    Convert an IFC file with IFCtoLBD and map it in one process.
+    The converted triples go straight into the mapping graph, so only the
+    final mapped file is serialized (no intermediate TTL is written and parsed).
+    filters and iri_mode are passed on to IFCtoLBD.convertIFCtoGraph.
+    """
+    # Imported here so mapping existing TTL files does not need ifcopenshell
+    import IFCtoLBD
+    
+    g = IFCtoLBD.convertIFCtoGraph(ifc_file, filters=filters, iri_mode=iri_mode, excelFile=excel_file)
+    print(f"✓ Converted {ifc_file} ({len(g)} triples)")
+    
+    output_g = map_graph_to_ontology(g, schema_file)
+    
+    output_g.serialize(destination=output_file, format="turtle")
+    print(f"✓ Successfully mapped properties to ontology vocabularies")
+    print(f"✓ Output file: {output_file}")
+    print(f"✓ Total triples in output: {len(output_g)}")
+
+def map_graph_to_ontology(g, schema_file=PROPERTY_SCHEMA_FILE):
+    """
+    Map the props: properties of graph g and return the mapped graph
+    (the in-memory part of map_properties_to_ontology)
+    """
+    # Units per property name, from the converter's property schema
+    property_schema = load_property_schema(schema_file)
+    
+    # Elements converted with type nodes get their type properties back first
+    expand_type_properties(g)
     
     # Create output graph
     output_g = Graph()
@@ -191,6 +282,11 @@ def map_properties_to_ontology(input_file, output_file):
             # Extract property name
             prop_name = str(pred).split("#")[-1].split("/")[-1]
             
+            # Annotate the property with its QUDT unit when this value is numeric
+            unit = property_schema.get(prop_name, "")
+            if unit in QUDT_UNITS and isinstance(obj, Literal) and obj.datatype in NUMERIC_DATATYPES:
+                output_g.add((pred, QUDT.unit, UNIT[QUDT_UNITS[unit]]))
+            
             # Check if we have a mapping for this property
             if prop_name in property_mapping:
                 # Get list of all mappings for this property
@@ -220,12 +316,7 @@ def map_properties_to_ontology(input_file, output_file):
     # Generate OWL equivalence statements for mapped properties
     generate_owl_equivalences(output_g, property_mapping, ns_mapping)
     
-    # Write output
-    output_g.serialize(destination=output_file, format="turtle")
-    print(f"✓ Successfully mapped properties to ontology vocabularies")
-    print(f"✓ Input file: {input_file}")
-    print(f"✓ Output file: {output_file}")
-    print(f"✓ Total triples in output: {len(output_g)}")
+    return output_g
 
 def generate_owl_equivalences(graph, property_mapping, ns_mapping):
     """
@@ -273,7 +364,7 @@ if __name__ == "__main__":
             output_file = f"{base}_mapped.ttl"
     else:
         # Use GUI file dialogs
-        print("Please select the input TTL file to map...")
+        print("Please select the input TTL/NT/NQ file to map...")
         
         root = Tk()
         root.withdraw()  # Hide main window
@@ -281,8 +372,10 @@ if __name__ == "__main__":
         
         # Select input file
         input_file = filedialog.askopenfilename(
-            title="Select input TTL file",
-            filetypes=[("Turtle files", "*.ttl"), ("All files", "*.*")],
+            title="Select input RDF file",
+            filetypes=[("RDF files", "*.ttl *.nt *.nq"), ("Turtle files", "*.ttl"),
+                       ("N-Triples files", "*.nt"), ("N-Quads files", "*.nq"),
+                       ("IFC files (convert and map)", "*.ifc"), ("All files", "*.*")],
             initialdir=os.getcwd()
         )
         
@@ -310,7 +403,11 @@ if __name__ == "__main__":
         root.destroy()
     
     try:
-        map_properties_to_ontology(input_file, output_file)
+        if input_file.lower().endswith(".ifc"):
+            # IFC input: convert and map in one pass, all element types
+            convert_ifc_and_map(input_file, output_file, filters={})
+        else:
+            map_properties_to_ontology(input_file, output_file)
     except Exception as e:
         print(f"Error: {e}")
         import traceback
@@ -0,0 +1,148 @@
+"""
+Non-blocking Tk progress window for the desktop tools (IFCtoLBD.py, compare_excel_datasets.py):
+the work runs on a background thread while the window shows a progress bar with
+counts, throughput and ETA, and a Cancel button that stops the work
+"""
+
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk
+
+# Seconds between two progress updates sent by the worker, and between two polls of the window
+UPDATE_INTERVAL = 0.1
+
+class Cancelled(Exception):
+    """Raised inside the task when the user pressed Cancel"""
+
+class ProgressReporter:
+    """
+    Handed to the task running on the worker thread. phase() starts a new
+    step (with a total when it is known), advance() counts done items and
+    raises Cancelled once the user pressed Cancel. Updates go through a
+    queue, the worker never touches Tk.
+    """
+
+    def __init__(self, events, cancel_event, unit):
+        self.events = events
+        self.cancel_event = cancel_event
+        self.unit = unit
+        self.text = ""
+        self.total = None
+        self.done = 0
+        self.started = time.monotonic()
+        self.reported = 0.0
+
+    def phase(self, text, total=None):
+        self.check()
+        self.text = text
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self.post()
+
+    def advance(self, count=1):
+        self.done += count
+        self.check()
+        now = time.monotonic()
+        if now - self.reported >= UPDATE_INTERVAL or self.done == self.total:
+            self.post(now)
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise Cancelled()
+
+    def post(self, now=None):
+        self.reported = now or time.monotonic()
+        self.events.put(('progress', self.text, self.done, self.total, self.reported - self.started))
+
+def format_status(unit, done, total, elapsed):
+    """'1,200 / 5,000 entities · 850 entities/s · ETA 0:04' (no ETA without a total)"""
+    if total is None and not done:
+        return ""
+    rate = done / elapsed if elapsed > 0 else 0
+    if total is None:
+        status = f"{done:,} {unit}"
+    else:
+        status = f"{done:,} / {total:,} {unit}"
+    if done and elapsed > 0:
+        status += f"  ·  {rate:,.0f} {unit}/s"
+        if total is not None and rate > 0:
+            remaining = int((total - done) / rate)
+            status += f"  ·  ETA {remaining // 60}:{remaining % 60:02d}"
+    return status
+
+def run_with_progress(root, title, task, unit="entities"):
+    """
+    Run task(reporter) on a worker thread while a progress window keeps the
+    Tk event loop running. Returns the task's result and re-raises its
+    exception, Cancelled when the user cancelled (the task stops at its
+    next advance() or phase() call).
+    """
+    events = queue.Queue()
+    cancel_event = threading.Event()
+    reporter = ProgressReporter(events, cancel_event, unit)
+
+    def work():
+        try:
+            events.put(('done', task(reporter)))
+        except BaseException as e:
+            events.put(('failed', e))
+
+    window = tk.Toplevel(root)
+    window.title(title)
+    window.resizable(False, False)
+    window.attributes('-topmost', True)
+    phase_label = tk.Label(window, text="Starting...", font=('Arial', 10, 'bold'), anchor='w')
+    phase_label.pack(fill='x', padx=15, pady=(15, 5))
+    bar = ttk.Progressbar(window, length=420, mode='indeterminate')
+    bar.pack(padx=15, pady=5)
+    bar.start(15)
+    status_label = tk.Label(window, text="", anchor='w')
+    status_label.pack(fill='x', padx=15, pady=5)
+
+    def cancel():
+        cancel_event.set()
+        phase_label.config(text="Cancelling...")
+        cancel_button.config(state='disabled')
+
+    cancel_button = tk.Button(window, text="Cancel", command=cancel, width=12)
+    cancel_button.pack(pady=(5, 15))
+    window.protocol("WM_DELETE_WINDOW", cancel)
+
+    outcome = {}
+
+    def poll():
+        try:
+            while True:
+                event = events.get_nowait()
+                if event[0] == 'progress':
+                    text, done, total, elapsed = event[1:]
+                    if not cancel_event.is_set():
+                        phase_label.config(text=text)
+                    if total is None:
+                        if bar['mode'] != 'indeterminate':
+                            bar.config(mode='indeterminate')
+                            bar.start(15)
+                    else:
+                        if bar['mode'] != 'determinate':
+                            bar.stop()
+                            bar.config(mode='determinate')
+                        bar.config(maximum=max(total, 1), value=done)
+                    status_label.config(text=format_status(unit, done, total, elapsed))
+                else:
+                    outcome[event[0]] = event[1]
+                    window.destroy()
+                    return
+        except queue.Empty:
+            pass
+        window.after(int(UPDATE_INTERVAL * 1000), poll)
+
+    threading.Thread(target=work, daemon=True).start()
+    window.after(int(UPDATE_INTERVAL * 1000), poll)
+    window.wait_window()
+
+    if 'failed' in outcome:
+        raise outcome['failed']
+    return outcome.get('done')
@@ -0,0 +1,47 @@
+"""
+Load RDF files written by IFCtoLBD.py (or any other tool) into an rdflib Graph,
+picking the parser from the file extension: .ttl Turtle, .nt N-Triples, .nq N-Quads
+"""
+
+from rdflib import Graph, Dataset, Namespace
+from rdflib.util import guess_format
+
+PROPS = Namespace("https://w3id.org/props#")
+
+def load_graph(file_path, expand_types=False):
+    """
+    Parse file_path into a Graph. N-Triples and N-Quads use rdflib's line-based
+    parsers, which are much faster than the Turtle parser on large files.
+    The named graphs of an N-Quads file are merged into one Graph.
+    With expand_types the type-node properties are copied back onto the
+    instances (see expand_type_properties).
+    """
+    rdf_format = guess_format(str(file_path)) or "turtle"
+    if rdf_format == "nquads":
+        # A plain Graph silently drops quads, so read them into a Dataset first
+        dataset = Dataset()
+        dataset.parse(file_path, format="nquads")
+        graph = Graph()
+        for s, p, o, c in dataset.quads():
+            graph.add((s, p, o))
+    else:
+        graph = Graph().parse(file_path, format=rdf_format)
+    if expand_types:
+        expand_type_properties(graph)
+    return graph
+
+def expand_type_properties(graph):
+    """
+    Undo the type deduplication of IFCtoLBD.py (--type-nodes): every instance
+    linked with props:hasElementType gets the props: properties of its type
+    node that it does not override itself. Returns the number of added triples.
+    """
+    added = 0
+    for instance, type_node in list(graph.subject_objects(PROPS.hasElementType)):
+        own = set(graph.predicates(instance, None))
+        for predicate, obj in list(graph.predicate_objects(type_node)):
+            if str(predicate).startswith(str(PROPS)) and predicate not in own \
+                    and predicate != PROPS.hasCompressedGuid:
+                graph.add((instance, predicate, obj))
+                added += 1
+    return added
@@ -0,0 +1,76 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+import openpyxl
+import pytest
+from rdflib import ConjunctiveGraph, Graph
+from rdflib.compare import to_isomorphic
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, "tests", "fixtures")
+CONVERTER = os.path.join(REPO_DIR, "IFCtoLBD.py")
+
+# inst: namespace of a conversion; it differs between runs in some IRI modes
+BASE_URI_PATTERN = re.compile(r"http://linkedbuildingdata\.net/ifc/resources[^/>\s]*/")
+
+@pytest.fixture
+def env(tmp_path):
+    """Environment of a converter run, with its caches (property schema,
+    calibration, conversion cache) under tmp_path instead of the real home folder"""
+    home = tmp_path / "home"
+    home.mkdir()
+    environ = dict(os.environ, HOME=str(home), USERPROFILE=str(home), PYTHONPATH=REPO_DIR)
+    environ.pop("DISPLAY", None)
+    return environ
+
+@pytest.fixture
+def fixture_copy(tmp_path):
+    """Copy a fixture into its own folder of tmp_path, so its outputs land next to it"""
+    def copy(name, folder, target=None):
+        folder = tmp_path / folder
+        folder.mkdir(exist_ok=True)
+        path = folder / (target or name)
+        shutil.copyfile(os.path.join(FIXTURES_DIR, name), path)
+        return path
+    return copy
+
+@pytest.fixture
+def convert(env):
+    """Run the headless converter CLI; fails the test when it does not exit with 0"""
+    def run(*args):
+        result = subprocess.run([sys.executable, CONVERTER] + [str(arg) for arg in args],
+                                env=env, capture_output=True, text=True, encoding='utf-8')
+        assert result.returncode == 0, result.stdout + result.stderr
+        return result.stdout
+    return run
+
+def load_graph(path):
+    """The triples of a .ttl, .nt or .nq output with the inst: namespace normalised"""
+    path = str(path)
+    with open(path, "r", encoding='utf-8') as f:
+        data = BASE_URI_PATTERN.sub("http://example.org/inst/", f.read())
+    if path.endswith(".nq"):
+        dataset = ConjunctiveGraph()
+        dataset.parse(data=data, format="nquads")
+        graph = Graph()
+        for triple in dataset.triples((None, None, None)):
+            graph.add(triple)
+        return graph
+    return Graph().parse(data=data, format="nt" if path.endswith(".nt") else "turtle")
+
+def assert_same_graph(first, second):
+    """Both outputs hold the same triples, blank nodes included"""
+    first_graph, second_graph = load_graph(first), load_graph(second)
+    assert len(first_graph) > 0
+    assert to_isomorphic(first_graph) == to_isomorphic(second_graph), f"{first} and {second} differ"
+
+def excel_rows(path):
+    """Data rows of an Excel output, sorted, since parallel runs may order them differently"""
+    wb = openpyxl.load_workbook(str(path), read_only=True)
+    rows = [tuple("" if value is None else str(value) for value in row)
+            for row in wb.active.iter_rows(min_row=2, values_only=True)]
+    wb.close()
+    return sorted(rows)
@@ -0,0 +1,103 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from rdflib import URIRef
+
+from conftest import assert_same_graph, excel_rows, load_graph
+
+BOT = "https://w3id.org/bot#"
+INST = "http://example.org/inst/"
+
+# Converts with checkpoints every 2 entities and stops after the given number of
+# entities, as if the process was killed halfway
+INTERRUPTED_RUN = """
+import sys
+import IFCtoLBD
+
+IFCtoLBD.CHECKPOINT_BATCH = 2
+entities = []
+
+def interrupt(count=1):
+    entities.append(count)
+    if len(entities) > int(sys.argv[3]):
+        raise KeyboardInterrupt
+
+IFCtoLBD.reportProgress = interrupt
+# The filters the CLI passes without filter options, so that --resume accepts the checkpoint
+filters = {key: True for key, ifc_class, writer, label in IFCtoLBD.LBD_CATEGORIES}
+filters.update(include_classes=[], exclude_classes=[], pset_patterns=[], property_patterns=[])
+IFCtoLBD.convertIFCSPFtoTTL(sys.argv[1], sys.argv[2], filters=filters, iri_mode='content', checkpoint=True)
+"""
+
+@pytest.fixture
+def serial(fixture_copy, convert):
+    """Outputs of a plain single-process conversion of the fixture"""
+    ifc = fixture_copy("model.ifc", "serial")
+    convert(ifc, "--iri-mode", "content")
+    return ifc.with_suffix(".ttl")
+
+@pytest.mark.parametrize("options", [["-w", "2"], ["--pipeline"], ["--checkpoint"]],
+                         ids=["workers", "pipeline", "checkpoint"])
+def test_conversion_modes_match_serial(serial, fixture_copy, convert, options):
+    ifc = fixture_copy("model.ifc", "mode")
+    convert(ifc, "--iri-mode", "content", *options)
+    assert_same_graph(serial, ifc.with_suffix(".ttl"))
+    assert excel_rows(serial.with_suffix(".xlsx")) == excel_rows(ifc.with_suffix(".xlsx"))
+
+def test_resume_after_interruption_matches_serial(serial, fixture_copy, convert, env):
+    ifc = fixture_copy("model.ifc", "resume")
+    ttl = ifc.with_suffix(".ttl")
+    result = subprocess.run([sys.executable, "-c", INTERRUPTED_RUN, str(ifc), str(ttl), "7"],
+                            env=env, capture_output=True, text=True)
+    assert result.returncode != 0
+    assert not ttl.exists()
+    assert json.loads(ifc.with_suffix(".journal.json").read_text())['done'] > 0
+
+    output = convert(ifc, "--iri-mode", "content", "--resume")
+    assert "Resuming after" in output
+    assert_same_graph(serial, ttl)
+    assert excel_rows(serial.with_suffix(".xlsx")) == excel_rows(ifc.with_suffix(".xlsx"))
+    assert not ifc.with_suffix(".journal.json").exists()
+
+def test_incremental_matches_full_conversion(fixture_copy, convert):
+    full = fixture_copy("model_rev2.ifc", "full", "model.ifc")
+    convert(full, "--iri-mode", "project")
+
+    ifc = fixture_copy("model.ifc", "incremental")
+    convert(ifc, "--iri-mode", "project", "--incremental")
+    fixture_copy("model_rev2.ifc", "incremental", "model.ifc")
+    output = convert(ifc, "--iri-mode", "project", "--incremental")
+    assert "Delta:" in output
+    assert_same_graph(full.with_suffix(".ttl"), ifc.with_suffix(".ttl"))
+    assert excel_rows(full.with_suffix(".xlsx")) == excel_rows(ifc.with_suffix(".xlsx"))
+
+def test_incremental_manifest_per_output_format(fixture_copy, convert):
+    ifc = fixture_copy("model.ifc", "formats")
+    convert(ifc, "--iri-mode", "project", "--incremental")
+    output = convert(ifc, "--iri-mode", "project", "--incremental", "--format", "nt")
+    assert "No previous conversion found" in output
+    assert ifc.with_suffix(".ttl.manifest.json").exists()
+    assert ifc.with_suffix(".nt.manifest.json").exists()
+    assert_same_graph(ifc.with_suffix(".ttl"), ifc.with_suffix(".nt"))
+
+@pytest.mark.parametrize("options", [["--classes", "IfcWall"], ["--classes", "IfcWall", "-w", "2"],
+                                     ["--exclude-classes", "IfcWall"], ["--exclude", "elements"]],
+                         ids=["classes", "classes-workers", "exclude-classes", "no-elements"])
+def test_filtered_conversion_has_no_dangling_topology_links(fixture_copy, convert, options):
+    ifc = fixture_copy("model.ifc", "filtered")
+    convert(ifc, "--iri-mode", "content", *options)
+    graph = load_graph(ifc.with_suffix(".ttl"))
+    subjects = set(graph.subjects())
+    dangling = {(str(p), str(o)) for s, p, o in graph
+                if str(p).startswith(BOT) and isinstance(o, URIRef) and str(o).startswith(INST)
+                and o not in subjects}
+    assert not dangling
+
+def test_profile_calibrate_without_psets(fixture_copy, convert, env):
+    ifc = fixture_copy("no_psets.ifc", "profile")
+    output = convert(ifc, "--profile", "--calibrate")
+    assert "Calibration saved" in output
+    with open(f"{env['HOME']}/.cache/ifctolbd/calibration.json", "r", encoding='utf-8') as f:
+        assert json.load(f)